@@ -1,14 +1,19 @@
 import datetime
 
-from flask import Flask, session, request
+from flask import Flask, session, request, g
 from flask_restful import Api
 
+from app.common.cache import Cache
 from app.common.database import Database
+from app.common.indexes import Indexes
+from app.common.representation import Representation
 from app.common.response import Response
+from app.models.dates.storage import DateStorage
+from app.models.locations.location import Location
 from app.models.reservations.constants import TIMEOUT
 from app.resources.admin import Admin, WhoReserved, PartyAvgSize, BusyHours, LicensedPilots, ReservationIncomeQty, \
     PromosDiscountQty, ReservationAvgPrice, AdminPayments, BuildReservationsReport, BuildPilotsReport, ForgotPassword, \
-    ResetPassword, Logout, UnprintedLicenses, BlockTurns, RetrieveAdmins, AlterAdmin
+    ResetPassword, Logout, UnprintedLicenses, BlockTurns, RetrieveAdmins, AlterAdmin, Metrics
 from app.resources.date import Dates, AvailableDatesUser, AvailableSchedulesUser, AvailableDatesAdmin, \
     AvailableSchedulesAdmin
 from app.resources.location import Locations
@@ -20,11 +25,19 @@ from app.resources.pilot import Pilots, Pilot
 from app.resources.reservation import Reservations, ReservationWithPromo, ReservationsDates, RetrieveReservation
 from config import config
 
+try:
+    from uwsgidecorators import postfork
+except ImportError:
+    # Not running under uwsgi, e.g. the development server
+    postfork = None
+
 
 def create_app(config_name):
     app = Flask(__name__)
     api = Api(app)
     app.config.from_object(config[config_name])
+    Representation.initialize(app.config.get('JSON_ENCODER'))
+    api.representation('application/json')(Representation.output_json)
     # Register our blueprints
     from .default import default as default_blueprint, qrs as qrs_blueprint, documentation as doc_blueprint
     app.register_blueprint(default_blueprint)
@@ -46,6 +59,7 @@ def create_app(config_name):
     api.add_resource(BuildReservationsReport, '/admin/build_reservations_report/<string:start_date>/<string:end_date>')
     api.add_resource(BuildPilotsReport, '/admin/build_pilots_report')
     api.add_resource(ReservationAvgPrice, '/admin/reservation_avg_price')
+    api.add_resource(Metrics, '/admin/metrics')
 
     api.add_resource(ForgotPassword, '/admin/forgot_password')
     api.add_resource(ResetPassword, '/admin/reset_password/<string:recovery_id>')
@@ -106,10 +120,25 @@ def create_app(config_name):
         response.headers.add('Access-Control-Allow-Origin', '*')
         response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
         response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE')
+        Database.QUERIES.flush()
+        if app.debug and 'db_queries' in g:
+            response.headers.add('X-DB-Queries', f"{g.db_queries} queries, {g.db_ms:.1f} ms")
         return response
 
-    @app.before_first_request
     def init_db():
-        Database.initialize()
+        DateStorage.initialize(app.config.get('DATES_LAYOUT'))
+        Location.initialize(app.config.get('LOCATIONS_TTL'))
+        if Database.initialize(app.config.get('MONGODB_OPTIONS'), app.config.get('QUERY_STATS'),
+                               app.config.get('READ_PROFILES')):
+            Cache.initialize(app.config.get('CACHE_BACKEND'), app.config.get('CACHE_SIZE'),
+                             app.config.get('CACHE_PATH'))
+            Database.warm_up()
+            Location.warm_up()
+            Indexes.warn_missing()
+
+    # Every uwsgi worker connects right after the fork, and any other server before its first request
+    if postfork is not None:
+        postfork(init_db)
+    app.before_first_request(init_db)
 
     return app
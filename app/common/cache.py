@@ -0,0 +1,136 @@
+import collections
+import pickle
+import sqlite3
+import threading
+import time
+
+"""
+This is the cache of the availability responses. Every entry is saved along with the version of the days it was
+computed from, so it is only served while none of those days has been written again.
+"""
+
+
+class LRUStore(object):
+    """
+    In-process store of each worker, which evicts the least recently used entries
+    """
+    def __init__(self, size=512):
+        self.size = size
+        self.entries = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value) -> None:
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+class SQLiteStore(object):
+    """
+    Local file store shared by all the workers of the same server, which evicts the oldest entries
+    """
+    def __init__(self, path, size=512):
+        self.path = path
+        self.size = size
+        self.local = threading.local()
+        self.connection().execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, created REAL)")
+
+    def connection(self):
+        if getattr(self.local, 'connection', None) is None:
+            self.local.connection = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+        return self.local.connection
+
+    def get(self, key):
+        row = self.connection().execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value) -> None:
+        connection = self.connection()
+        connection.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?)", (key, value, time.time()))
+        connection.execute("DELETE FROM cache WHERE key NOT IN (SELECT key FROM cache ORDER BY created DESC LIMIT ?)",
+                           (self.size,))
+
+    def clear(self) -> None:
+        self.connection().execute("DELETE FROM cache")
+
+
+class Cache(object):
+    STORE = None
+    STATS = collections.defaultdict(collections.Counter)
+
+    @staticmethod
+    def initialize(backend='memory', size=512, path=None) -> None:
+        """
+        Chooses the store of the cache
+        :param backend: 'memory' for a LRU store in each worker, 'sqlite' for a file shared by the workers, or None
+                        to disable the cache
+        :param size: Maximum number of entries in the store
+        :param path: Path of the file of the sqlite store
+        :return: None
+        """
+        if backend == 'memory':
+            Cache.STORE = LRUStore(size)
+        elif backend == 'sqlite':
+            Cache.STORE = SQLiteStore(path, size)
+        else:
+            Cache.STORE = None
+
+    @classmethod
+    def get(cls, name, key, version):
+        """
+        Retrieves a cached response, only if it was computed from the given version of the days
+        :param name: The name of the cached function
+        :param key: Tuple with the arguments of the function
+        :param version: Tuple with the version of every day involved, as returned by DateSummary.get_version
+        :return: A copy of the cached response, or None if it is missing or outdated
+        """
+        if cls.STORE is None or not version:
+            return None
+        entry = cls.STORE.get(repr((name, key)))
+        if entry is not None:
+            entry_version, value = pickle.loads(entry)
+            if entry_version == version:
+                cls.STATS[name]['hits'] += 1
+                return value
+        cls.STATS[name]['misses'] += 1
+        return None
+
+    @classmethod
+    def set(cls, name, key, version, value) -> None:
+        """
+        Saves a response along with the version of the days it was computed from
+        :param name: The name of the cached function
+        :param key: Tuple with the arguments of the function
+        :param version: Tuple with the version of every day involved; days without version are never cached
+        :param value: The response to be cached
+        :return: None
+        """
+        if cls.STORE is None or not version:
+            return
+        cls.STORE.set(repr((name, key)), pickle.dumps((version, value), pickle.HIGHEST_PROTOCOL))
+
+    @classmethod
+    def stats(cls) -> dict:
+        """
+        Counts the hits and misses of every cached function in the current worker
+        :return: JSON object with the hits, misses and hit ratio of each function
+        """
+        stats = dict()
+        for name, counter in cls.STATS.items():
+            total = counter['hits'] + counter['misses']
+            stats[name] = {'hits': counter['hits'], 'misses': counter['misses'],
+                           'hit_ratio': counter['hits'] / total if total else 0}
+        return stats
@@ -0,0 +1,164 @@
+import datetime
+
+from pymongo.errors import PyMongoError
+
+from app.common.database import Database
+from app.models.admins.constants import INDEXES as ADMIN_INDEXES, COLLECTION as ADMINS, SUPERADMINS
+from app.models.dates.constants import INDEXES as DATE_INDEXES, COLLECTION as DATES, SUMMARY_COLLECTION, \
+    TURNS_COLLECTION, MEXICO_TZ, RELEASED_TYPES
+from app.models.pilots.constants import INDEXES as PILOT_INDEXES, COLLECTION as PILOTS
+from app.models.promos.constants import INDEXES as PROMO_INDEXES, COLLECTION as PROMOS
+from app.models.recoveries.constants import INDEXES as RECOVERY_INDEXES, COLLECTION as RECOVERIES
+from app.models.reservations.constants import INDEXES as RESERVATION_INDEXES, COLLECTION as RESERVATIONS, \
+    COLLECTION_TEMP
+from app.models.users.constants import INDEXES as USER_INDEXES, COLLECTION as USERS
+
+"""
+This gathers the indexes declared in the constants of every model, so they can be created and compared against the
+indexes that actually exist in the database.
+"""
+
+# Options of an index that change what it enforces or which documents it holds
+OPTIONS = ('unique', 'sparse', 'partialFilterExpression', 'expireAfterSeconds')
+
+DAY = MEXICO_TZ.localize(datetime.datetime(2026, 1, 1))
+# The frequent lookups of the application, in the shapes they are sent, with sample values, to be explained against
+# the existing indexes
+MONTH = {'$gte': DAY, '$lte': DAY + datetime.timedelta(days=30)}
+QUERIES = [
+    (DATES, {'date': DAY}),
+    (DATES, {'date': MONTH}),
+    (DATES, {'$or': [{'schedules.turns.pilots.allocation_date': {'$lte': DAY}},
+                     {'schedules.turns': {'$elemMatch': {'pilots': [], 'type': {'$in': RELEASED_TYPES}}}}]}),
+    (SUMMARY_COLLECTION, {'date': MONTH}),
+    (TURNS_COLLECTION, {'date': DAY, 'hour': '11', 'turn_number': 1, 'occupied': {'$bitsAllClear': 3}, 'type': None}),
+    (TURNS_COLLECTION, {'date': MONTH, 'hour': {'$in': ['11', '12']}}),
+    (TURNS_COLLECTION, {'day_id': ''}),
+    (TURNS_COLLECTION, {'$or': [{'pilots.allocation_date': {'$lte': DAY}},
+                                {'pilots': [], 'type': {'$in': RELEASED_TYPES}}]}),
+    (RESERVATIONS, {'date': MONTH}),
+    (RESERVATIONS, {'date': {'$lte': DAY}}),
+    (RESERVATIONS, {'date': MONTH, 'discount': {'$ne': None}}),
+    (RESERVATIONS, {'turns._id': ''}),
+    (COLLECTION_TEMP, {'date': {'$lt': DAY}}),
+    (PILOTS, {'location': {'$regex': 'Carso'}}),
+    (PROMOS, {'coupons._id': ''}),
+    (RECOVERIES, {'admin_email': ''}),
+    (USERS, {'email': ''}),
+    (ADMINS, {'email': ''}),
+    (SUPERADMINS, {'email': ''})
+]
+
+
+class Indexes(object):
+    EXPECTED = {collection: indexes
+                for model_indexes in (ADMIN_INDEXES, DATE_INDEXES, PILOT_INDEXES, PROMO_INDEXES, RECOVERY_INDEXES,
+                                      RESERVATION_INDEXES, USER_INDEXES)
+                for collection, indexes in model_indexes.items()}
+
+    @staticmethod
+    def spec(index: dict) -> tuple:
+        """
+        Summarises what an index enforces, regardless of its name
+        :param index: The document of an IndexModel, or the information of an existing index
+        :return: Tuple with the keys of the index and the values of its options
+        """
+        keys = tuple((field, direction) for field, direction in dict(index.get('key')).items())
+        options = tuple(bool(index.get(option)) if option in ('unique', 'sparse') else index.get(option)
+                        for option in OPTIONS)
+        return keys, options
+
+    @classmethod
+    def check(cls) -> dict:
+        """
+        Compares the declared indexes of every collection with the ones in the database, by their keys and options
+        :return: JSON object with the names of the missing, the different (same keys but other options) and the extra
+                 indexes of each collection
+        """
+        report = dict()
+        for collection, indexes in cls.EXPECTED.items():
+            existing = {name: cls.spec(information)
+                        for name, information in Database.DATABASE[collection].index_information().items()
+                        if name != '_id_'}
+            existing_keys = [keys for keys, options in existing.values()]
+            missing, different, matched = list(), list(), list()
+            for index in indexes:
+                keys, options = cls.spec(index.document)
+                if (keys, options) in existing.values():
+                    matched.append((keys, options))
+                elif keys in existing_keys:
+                    different.append(index.document.get('name'))
+                    matched.append(next(spec for spec in existing.values() if spec[0] == keys))
+                else:
+                    missing.append(index.document.get('name'))
+            report[collection] = {'missing': missing, 'different': different,
+                                  'extra': [name for name, spec in existing.items() if spec not in matched]}
+        return report
+
+    @classmethod
+    def ensure(cls) -> dict:
+        """
+        Creates the declared indexes that are missing in the database; different and extra indexes are only reported,
+        since they must be dropped by hand before the declared ones can be created
+        :return: JSON object with the names of the created, failed, different, and extra indexes of each collection
+        """
+        report = dict()
+        for collection, status in cls.check().items():
+            missing = [index for index in cls.EXPECTED.get(collection)
+                       if index.document.get('name') in status.get('missing')]
+            created, failed = list(), list()
+            for index in missing:
+                try:
+                    Database.DATABASE[collection].create_indexes([index])
+                    created.append(index.document.get('name'))
+                except PyMongoError as e:
+                    failed.append({'name': index.document.get('name'), 'error': str(e)})
+            report[collection] = {'created': created, 'failed': failed, 'different': status.get('different'),
+                                  'extra': status.get('extra')}
+        return report
+
+    @classmethod
+    def warn_missing(cls) -> None:
+        """
+        Prints a warning for every declared index that is missing in the database, or exists with other options
+        :return: None
+        """
+        try:
+            for collection, status in cls.check().items():
+                for name in status.get('missing'):
+                    print(f"Advertencia: falta el índice {name} en la colección {collection}, "
+                          f"ejecuta 'python manage.py ensure-indexes'")
+                for name in status.get('different'):
+                    print(f"Advertencia: el índice {name} de la colección {collection} existe con otras opciones")
+        except PyMongoError as e:
+            print(e.__repr__())
+
+    @staticmethod
+    def stages(plan) -> list:
+        """
+        Lists every stage of a query plan, at any depth
+        :param plan: The plan, or any of its values
+        :return: List of the names of the stages
+        """
+        if isinstance(plan, list):
+            return [stage for item in plan for stage in Indexes.stages(item)]
+        if not isinstance(plan, dict):
+            return []
+        stages = [plan.get('stage')] if plan.get('stage') else []
+        return stages + [stage for value in plan.values() for stage in Indexes.stages(value)]
+
+    @staticmethod
+    def explain() -> list:
+        """
+        Explains the frequent lookups of the application, to find the ones that are not served by an index
+        :return: List of JSON objects with the collection, the query, the stages of its winning plan, and whether it
+                 scans the whole collection instead of an index
+        """
+        report = list()
+        for collection, query in QUERIES:
+            plan = Database.DATABASE[collection].find(query).explain().get('queryPlanner', {}).get('winningPlan', {})
+            stages = Indexes.stages(plan)
+            report.append({'collection': collection, 'query': query, 'stages': stages,
+                           'collscan': 'COLLSCAN' in stages or not any(stage.endswith('IXSCAN') or stage == 'IDHACK'
+                                                                       for stage in stages)})
+        return report
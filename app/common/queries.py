@@ -0,0 +1,201 @@
+import collections
+import threading
+
+import numpy
+from flask import g, has_request_context, request
+from pymongo import monitoring
+from pymongo.errors import PyMongoError
+
+"""
+This is the instrumentation of the MongoDB operations. Every command sent by the MongoClient of the worker is timed,
+so the admin metrics show which collections and operations dominate the time of the requests.
+"""
+
+# Upper bounds, in milliseconds, of the buckets of the latency histograms
+BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+# Commands of the driver itself, which aren't operations of the application
+IGNORED_COMMANDS = {'ismaster', 'isMaster', 'hello', 'ping', 'saslStart', 'saslContinue', 'getnonce', 'authenticate',
+                    'endSessions', 'explain', 'buildinfo', 'buildInfo'}
+# Read profile of the commands sent without one
+DEFAULT_PROFILE = 'primary'
+# Open cursors whose read profile is remembered for their getMore commands
+CURSORS = 1000
+# Fields added by the driver, which can't be sent back inside an explain
+DRIVER_FIELDS = {'lsid', 'txnNumber', '$db', '$clusterTime', '$readPreference', 'readConcern', 'writeConcern'}
+
+
+class QueryStats(monitoring.CommandListener):
+    """
+    Times every command of the current process, keeping the latest latencies of each collection and operation, the
+    totals of each endpoint and read profile, and the queries of each request
+    """
+    def __init__(self, slow_ms=100, explain=False, window=1000):
+        self.slow_ms = slow_ms
+        self.explain = explain
+        self.window = window
+        self.commands = dict()
+        self.latencies = collections.defaultdict(lambda: collections.deque(maxlen=self.window))
+        self.documents = collections.Counter()
+        self.failures = collections.Counter()
+        self.endpoints = collections.defaultdict(collections.Counter)
+        self.profiles = collections.defaultdict(collections.Counter)
+        self.servers = collections.defaultdict(collections.Counter)
+        self.cursors = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        command = event.command
+        # The value of the command is its collection, except for the getMore of a cursor
+        collection = command.get('collection') if event.command_name == 'getMore' else command.get(event.command_name)
+        document = {key: value for key, value in command.items() if key not in DRIVER_FIELDS}
+        # The read profile travels as the comment of the command, and the getMore of a cursor inherits it
+        profile = command.get('comment') if isinstance(command.get('comment'), str) else DEFAULT_PROFILE
+        with self.lock:
+            if event.command_name == 'getMore':
+                profile = self.cursors.get(command.get('getMore'), DEFAULT_PROFILE)
+            self.commands[event.request_id] = (event.command_name, collection, document, profile)
+
+    def succeeded(self, event):
+        self.record(event)
+
+    def failed(self, event):
+        self.record(event, failed=True)
+
+    @staticmethod
+    def documents_count(reply) -> int:
+        """
+        Counts the documents returned or written by a command
+        :param reply: The reply of the server
+        :return: The number of documents
+        """
+        cursor = reply.get('cursor')
+        if cursor is not None:
+            return len(cursor.get('firstBatch', cursor.get('nextBatch', [])))
+        return reply.get('n', 0)
+
+    def track_cursor(self, name, document, reply, profile) -> None:
+        """
+        Remembers the read profile of an open cursor, so its getMore commands are counted in the same profile, and
+        forgets it once the cursor is exhausted or killed
+        :param name: The name of the command
+        :param document: The command
+        :param reply: The reply of the server
+        :param profile: The read profile of the command
+        :return: None
+        """
+        if name == 'killCursors':
+            for cursor_id in document.get('cursors', []):
+                self.cursors.pop(cursor_id, None)
+            return
+        cursor = reply.get('cursor')
+        if cursor is None:
+            return
+        if cursor.get('id'):
+            self.cursors[cursor.get('id')] = profile
+            while len(self.cursors) > CURSORS:
+                self.cursors.popitem(last=False)
+        elif name == 'getMore':
+            self.cursors.pop(document.get('getMore'), None)
+
+    def record(self, event, failed=False) -> None:
+        """
+        Adds the duration of a finished command to the histograms, the endpoint and profile totals and the current
+        request
+        :param event: The succeeded or failed event of the command
+        :param failed: Whether the command failed
+        :return: None
+        """
+        with self.lock:
+            command = self.commands.pop(event.request_id, None)
+        if command is None:
+            return
+        name, collection, document, profile = command
+        key = f'{collection}.{name}'
+        ms = event.duration_micros / 1000
+        count = 0 if failed else self.documents_count(event.reply)
+        endpoint = request.endpoint if has_request_context() else None
+        server = '{}:{}'.format(*event.connection_id)
+        with self.lock:
+            self.latencies[key].append(ms)
+            self.documents[key] += count
+            if failed:
+                self.failures[key] += 1
+            else:
+                self.track_cursor(name, document, event.reply, profile)
+            self.endpoints[endpoint]['queries'] += 1
+            self.endpoints[endpoint]['ms'] += ms
+            self.profiles[profile]['queries'] += 1
+            self.profiles[profile]['ms'] += ms
+            self.servers[profile][server] += 1
+        entry = {'collection': collection, 'operation': name, 'ms': round(ms, 3), 'documents': count,
+                 'endpoint': endpoint, 'profile': profile, 'server': server, 'command': document}
+        if has_request_context():
+            g.db_queries = g.get('db_queries', 0) + 1
+            g.db_ms = g.get('db_ms', 0) + ms
+            if ms >= self.slow_ms:
+                g.setdefault('slow_queries', []).append(entry)
+        elif ms >= self.slow_ms:
+            # Outside of a request, e.g. the scripts, there's no later moment to explain the command
+            self.log(entry)
+
+    def log(self, entry: dict, plan=None) -> None:
+        """
+        Writes a slow command to the log of the server
+        :param entry: The collection, operation, duration, documents, endpoint and command of the slow command
+        :param plan: The winning plan of the command, if it was explained
+        :return: None
+        """
+        print(f"Consulta lenta: {entry.get('collection')}.{entry.get('operation')} {entry.get('ms')} ms, "
+              f"{entry.get('documents')} documentos, endpoint {entry.get('endpoint')}, perfil {entry.get('profile')} "
+              f"en {entry.get('server')}: {str(entry.get('command'))[:1000]}")
+        if plan is not None:
+            print(f"Plan de la consulta lenta: {plan}")
+
+    def flush(self) -> None:
+        """
+        Writes the slow commands of the current request to the log, explaining them if it is enabled. It runs after
+        the request, because a command can't be sent from inside the listener of another command
+        :return: None
+        """
+        from app.common.database import Database
+        for entry in g.pop('slow_queries', []):
+            plan = None
+            if self.explain and entry.get('operation') in ('find', 'aggregate', 'count', 'distinct'):
+                try:
+                    explain = Database.DATABASE.command('explain', entry.get('command'), verbosity='queryPlanner')
+                    plan = explain.get('queryPlanner', {}).get('winningPlan')
+                except PyMongoError as e:
+                    plan = e.__repr__()
+            self.log(entry, plan)
+
+    def json(self) -> dict:
+        """
+        Summarises the latest latencies of each collection and operation, and the totals of each endpoint and read
+        profile
+        :return: JSON object with the percentiles and histogram of each operation, the totals of each endpoint, and
+                 the totals and servers of each read profile
+        """
+        with self.lock:
+            latencies = {key: list(values) for key, values in self.latencies.items()}
+            documents = dict(self.documents)
+            failures = dict(self.failures)
+            endpoints = {str(endpoint): {'queries': counter['queries'], 'ms': round(counter['ms'], 3)}
+                         for endpoint, counter in self.endpoints.items()}
+            profiles = {profile: {'queries': counter['queries'], 'ms': round(counter['ms'], 3),
+                                  'servers': dict(self.servers[profile])}
+                        for profile, counter in self.profiles.items()}
+        operations = dict()
+        for key, values in latencies.items():
+            values = numpy.array(values)
+            p50, p95, p99 = numpy.percentile(values, (50, 95, 99)).round(3).tolist()
+            histogram = numpy.histogram(values, bins=(0,) + BUCKETS + (numpy.inf,))[0].tolist()
+            operations[key] = {'count': len(values), 'p50': p50, 'p95': p95, 'p99': p99,
+                               'max': round(float(values.max()), 3),
+                               'histogram': dict(zip([f'<{bound}' for bound in BUCKETS] + [f'>={BUCKETS[-1]}'],
+                                                     histogram)),
+                               'documents': documents.get(key, 0),
+                               'failures': failures.get(key, 0)}
+        return {'slow_ms': self.slow_ms, 'window': self.window, 'operations': operations, 'endpoints': endpoints,
+                'profiles': profiles}
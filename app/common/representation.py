@@ -0,0 +1,100 @@
+import datetime
+import decimal
+import json
+
+import numpy
+from bson import ObjectId, Decimal128
+from flask import current_app, make_response
+
+from app.models.baseModel import BaseModel, DATE_FORMAT
+from app.models.baseView import BaseView
+from app.models.dates.constants import MEXICO_TZ
+
+try:
+    import orjson
+except ImportError:
+    # Without orjson the responses are encoded by the stdlib encoder
+    orjson = None
+
+"""
+This is the JSON representation of the API. It serializes the models, the datetimes and the BSON types directly, with
+orjson when it is installed, or with the stdlib encoder otherwise.
+"""
+
+ORJSON = 'orjson'
+STDLIB = 'json'
+
+
+class Representation(object):
+    ENCODER = ORJSON if orjson is not None else STDLIB
+
+    @staticmethod
+    def initialize(encoder=None) -> None:
+        """
+        Chooses the encoder of the responses
+        :param encoder: 'orjson', 'json' for the stdlib encoder, or None for the fastest one installed; orjson falls
+                        back to the stdlib encoder when it isn't installed
+        :return: None
+        """
+        if encoder == STDLIB or orjson is None:
+            Representation.ENCODER = STDLIB
+        else:
+            Representation.ENCODER = ORJSON
+
+    @staticmethod
+    def default(value):
+        """
+        Serializes the values that the encoders don't support natively
+        :param value: A model, view, datetime, date, BSON or numpy value
+        :return: Its JSON value; the aware datetimes are formatted in the Mexico City timezone, as the models do
+        """
+        if isinstance(value, BaseModel):
+            return value.json()
+        if isinstance(value, BaseView):
+            return BaseModel.raw_json(value.document)
+        if isinstance(value, datetime.datetime):
+            if value.tzinfo is not None:
+                value = value.astimezone(MEXICO_TZ)
+            return value.strftime(DATE_FORMAT)
+        if isinstance(value, datetime.date):
+            return value.isoformat()
+        if isinstance(value, ObjectId):
+            return str(value)
+        if isinstance(value, Decimal128):
+            return str(value.to_decimal())
+        if isinstance(value, decimal.Decimal):
+            return str(value)
+        if isinstance(value, numpy.generic):
+            return value.item()
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    @staticmethod
+    def dumps(data, indent=None) -> str:
+        """
+        Encodes the data as JSON with the chosen encoder
+        :param data: The data of the response
+        :param indent: Whether to indent the JSON, for the debug mode
+        :return: The JSON string
+        """
+        if Representation.ENCODER == ORJSON:
+            # orjson formats the datetimes on its own unless they are passed through to the default function
+            option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            return orjson.dumps(data, default=Representation.default, option=option).decode()
+        return json.dumps(data, default=Representation.default, indent=indent)
+
+    @staticmethod
+    def output_json(data, code, headers=None):
+        """
+        Makes the response of a resource with a JSON body, replacing the default representation of flask_restful
+        :param data: The data returned by the resource
+        :param code: The status code
+        :param headers: The headers returned by the resource
+        :return: Flask response
+        """
+        settings = current_app.config.get('RESTFUL_JSON', {})
+        indent = settings.get('indent', 4 if current_app.debug else None)
+        response = make_response(Representation.dumps(data, indent) + "\n", code)
+        response.headers.extend(headers or {})
+        return response
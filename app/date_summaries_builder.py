@@ -0,0 +1,10 @@
+from app.models.dates.summary import DateSummary
+from app.common.database import Database
+
+Database.initialize()
+
+try:
+    DateSummary.refresh_dates({})
+    print("Resumenes de disponibilidad reconstruidos con exito")
+except Exception as e:
+    print(e.__repr__())
@@ -4,7 +4,9 @@ from app.common.database import Database
 Database.initialize()
 
 try:
-    month = DateModel.insert_dates()
-    print(f"Mes insertado con exito : {month}")
+    month, result = DateModel.insert_dates()
+    print(f"Mes insertado con exito : {month}, días insertados: {result.get('inserted')}")
+    for error in result.get('errors'):
+        print(f"Error en el día {error.get('index') + 1}: {error.get('message')}")
 except Exception as e:
     print(e.__repr__())
@@ -0,0 +1,17 @@
+import sys
+
+from app.common.database import Database
+from app.models.dates.constants import TURNS_LAYOUT, EMBEDDED_LAYOUT
+from app.models.dates.storage import DateStorage
+
+Database.initialize()
+
+# Usage: python app/dates_layout_migration.py turns|embedded, with the application stopped; then set DATES_LAYOUT
+try:
+    layout = sys.argv[1] if len(sys.argv) > 1 else TURNS_LAYOUT
+    if layout not in (TURNS_LAYOUT, EMBEDDED_LAYOUT):
+        raise ValueError(f"Esquema desconocido: {layout}")
+    migrated = DateStorage.migrate(layout)
+    print(f"Días migrados al esquema '{layout}': {migrated}")
+except Exception as e:
+    print(e.__repr__())
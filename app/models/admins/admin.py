@@ -3,10 +3,11 @@ import os
 
 from flask import session
 from app import Database
+from app.common.cache import Cache
 from app.common.utils import Utils
 from app.models.admins.errors import InvalidEmail, InvalidLogin, AdminNotFound, ReportFailed
 from app.models.baseModel import BaseModel
-from app.models.admins.constants import COLLECTION, SUPERADMINS
+from app.models.admins.constants import COLLECTION, SUPERADMINS, BLOCKED_TYPES, ANALYTICS
 from app.models.dates.constants import COLLECTION as DATES, MEXICO_TZ
 from app.models.pilots.errors import PilotNotFound
 from app.models.pilots.pilot import Pilot
@@ -15,6 +16,9 @@ from app.models.recoveries.recovery import Recovery
 from app.models.reservations.constants import COLLECTION as RESERVATIONS
 from app.models.pilots.constants import COLLECTION as PILOTS
 from app.models.dates.date import Date
+from app.models.dates.storage import DateStorage
+from app.models.dates.summary import DateSummary
+from app.models.dates.views import DateView
 from app.models.emails.email import Email
 from app.models.emails.errors import EmailErrors, FailedToSendEmail
 from app.models.promos.promotion import Promotion
@@ -398,9 +402,15 @@ class Admin(BaseModel):
         :param turn: The turn of the reservation to be found
         :return: The information of the pilots in the found reservation
         """
-        for d in Database.find(DATES, {}):
-            prob_date = Date(**d)
-            if datetime.datetime.strftime(prob_date.date, "%Y-%m-%d") == date:
+        try:
+            query = {'date': MEXICO_TZ.localize(datetime.datetime.strptime(date, "%Y-%m-%d"))}
+        except ValueError:
+            query = None
+        # Only a valid schedule is loaded by its position, since any other one would slice a different schedule
+        if query is not None and DateStorage.valid_hour(schedule) and str(turn).isdigit():
+            d = DateStorage.find_one(query, hours=[schedule])
+            if d:
+                prob_date = DateView(d)
                 for s in prob_date.schedules:
                     if s.hour == schedule:
                         for t in s.turns:
@@ -414,8 +424,7 @@ class Admin(BaseModel):
         Calculates the party average size taking into account every reservation
         :return: Party average size
         """
-        expressions = list()
-        expressions.append({"$match": {}})
+        expressions = DateStorage.pipeline({})
         expressions.append({"$project": {
             "weekday": {"$dayOfWeek": "$date"},
             "schedules": "$schedules"
@@ -432,7 +441,7 @@ class Admin(BaseModel):
             "party_size": {"$sum": "$pilots_size"}
         }})
         expressions.append({"$sort": {"_id.weekday": 1, "_id.schedule": 1}})
-        result = list(Database.aggregate(DATES, expressions))
+        result = list(Database.aggregate(DATES, expressions, ANALYTICS))
         return result
 
     @staticmethod
@@ -441,8 +450,7 @@ class Admin(BaseModel):
         Builds the occupation by hour and by week
         :return: The sum of the party size per hour and week
         """
-        expressions = list()
-        expressions.append({"$match": {}})
+        expressions = DateStorage.pipeline({})
         expressions.append({"$project": {
             "weekday": {"$dayOfWeek": "$date"},
             "schedules": "$schedules"
@@ -464,7 +472,7 @@ class Admin(BaseModel):
             "party_size": {"$sum": "$party_size"}
         }})
         expressions.append({"$sort": {"_id.schedule": 1}})
-        result = list(Database.aggregate(DATES, expressions))
+        result = list(Database.aggregate(DATES, expressions, ANALYTICS))
         return result
 
     @staticmethod
@@ -476,7 +484,7 @@ class Admin(BaseModel):
         """
         expressions = list()
         expressions.append({"$match": {"location": {"$regex": location}}})
-        result = list(Database.aggregate(PILOTS, expressions))
+        result = list(Database.aggregate(PILOTS, expressions, ANALYTICS))
         return result
 
     @staticmethod
@@ -489,6 +497,7 @@ class Admin(BaseModel):
         expressions = list()
         first_date = datetime.datetime.now()
         expressions.append({'$match': {'date': {'$lte': first_date}}})
+        expressions.append({"$project": {"pilots.email": 1}})
         expressions.append({"$unwind": "$pilots"})
         expressions.append({"$project": {"pilots": "$pilots"}})
         expressions.append({"$group": {
@@ -534,7 +543,7 @@ class Admin(BaseModel):
         expressions.append({'$match': {'date': {'$gte': first_date, '$lte': last_date}}})
         expressions.append({"$project": {"payment_total": "$amount"}})
         expressions.append({"$group": {"_id": None, "income": {"$sum": "$payment_total"}, "qty": {"$sum": 1}}})
-        result = list(Database.aggregate(RESERVATIONS, expressions))
+        result = list(Database.aggregate(RESERVATIONS, expressions, ANALYTICS))
         return result
 
     @staticmethod
@@ -548,9 +557,19 @@ class Admin(BaseModel):
         expressions.append({"$project": {"payment_total": "$amount"}})
         expressions.append({"$group": {"_id": None, "income": {"$sum": "$payment_total"}, "count": {"$sum": 1}}})
         expressions.append({"$project": {"avg_price": {"$divide": ["$income", "$count"]}}})
-        result = list(Database.aggregate(RESERVATIONS, expressions))
+        result = list(Database.aggregate(RESERVATIONS, expressions, ANALYTICS))
         return result
 
+    @staticmethod
+    def get_metrics() -> dict:
+        """
+        Gathers the performance counters of the current worker
+        :return: JSON object with the hits and misses of the availability cache, the state of the connection pool, the
+                 latencies of the database operations, and the conflicts of the writes of the turns
+        """
+        return {'cache': Cache.stats(), 'database': Database.pool_stats(), 'queries': Database.query_stats(),
+                'concurrency': DateStorage.concurrency_stats()}
+
     @staticmethod
     def get_promos_discount_qty(first_date, last_date) -> list:
         """
@@ -565,7 +584,7 @@ class Admin(BaseModel):
         expressions.append({'$match': {'date': {'$gte': first_date, '$lte': last_date}}})
         expressions.append({"$match": {"discount": {"$ne": None}}})
         expressions.append({"$group": {"_id": None, "discount": {"$sum": "$discount"}, "qty": {"$sum": 1}}})
-        result = list(Database.aggregate(RESERVATIONS, expressions))
+        result = list(Database.aggregate(RESERVATIONS, expressions, ANALYTICS))
         return result
 
     @staticmethod
@@ -587,7 +606,7 @@ class Admin(BaseModel):
                                          "Número_Pilotos": {"$size": "$pilots"},
                                          "Número_Carreras": {"$size": "$turns"},
                                          "Precio_Total": "$amount"}})
-        result = list(Database.aggregate(RESERVATIONS, expressions))
+        result = list(Database.aggregate(RESERVATIONS, expressions, ANALYTICS))
         if not result:
             raise ReportFailed("El reporte generó cero datos. Intente con otra fecha.")
 
@@ -621,7 +640,7 @@ class Admin(BaseModel):
                                            "_id.Número_Carreras": "$Número_Carreras",
                                            "_id.Total_Gastado": "$Total_Gastado"}})
         expressions.append({"$replaceRoot": {"newRoot": "$_id"}})
-        result = list(Database.aggregate(RESERVATIONS, expressions))
+        result = list(Database.aggregate(RESERVATIONS, expressions, ANALYTICS))
         if not result:
             raise ReportFailed("El reporte generó cero datos. Intente con otra fecha.")
 
@@ -666,30 +685,20 @@ class Admin(BaseModel):
             raise AdminNotFound("El administrador con el ID dado no existe.")
 
     @staticmethod
-    def block_turns(days: list, schedules: list, turns: list, block: str) -> None:
+    def block_turns(days: list, schedules: list, turns: list, block: str) -> dict:
+        """
+        Blocks or unblocks the given turns of the given schedules and days, with a single bulk write
+        :param days: List of days, as "%Y-%m-%d"
+        :param schedules: List of hours of the schedules
+        :param turns: List of turn numbers
+        :param block: "True" to block the turns, "False" to unblock them
+        :return: JSON object with the matched and modified counts of the bulk write, and its errors
+        """
         days = [MEXICO_TZ.localize(datetime.datetime.strptime(aware_datetime, "%Y-%m-%d")) for aware_datetime in days]
-        dates = list(Database.find(DATES, {'date': {"$in": days}}))
-        for date in dates:
-            updated_date = Date(**date)
-            for schedule in updated_date.schedules:
-                if schedule.hour in schedules:
-                    for turn in schedule.turns:
-                        if turn.turn_number in turns:
-                            if block == "True":
-                                if turn.type is None or turn.type == "BLOQUEADO":
-                                    turn.type = "BLOQUEADO"
-                                elif "-BLOQUEADO" in turn.type:
-                                    pass
-                                else:
-                                    turn.type = turn.type + "-BLOQUEADO"
-                            elif block == "False":
-                                if turn.type is None or turn.type == "BLOQUEADO":
-                                    turn.type = None
-                                elif turn.type == "Adultos" or turn.type == "Niños":
-                                    pass
-                                else:
-                                    turn.type = turn.type[:-len("-BLOQUEADO")]
-            updated_date.update_mongo(DATES)
+        types = BLOCKED_TYPES if block == "True" else {new: old for old, new in BLOCKED_TYPES.items()}
+        result = DateStorage.set_types(days, schedules, turns, types)
+        DateSummary.refresh_dates({'date': {"$in": days}})
+        return result
 
     def alter_data(self, new_data):
         """
@@ -1,8 +1,22 @@
 from flask_restful import reqparse
+from pymongo import ASCENDING, IndexModel
 
 COLLECTION = 'admins'
 SUPERADMINS = 'super_admins'
 
+INDEXES = {
+    COLLECTION: [IndexModel([('email', ASCENDING)], unique=True)],
+    SUPERADMINS: [IndexModel([('email', ASCENDING)], unique=True)]
+}
+
+# Read profile of the analytics and reports, which may be served by the secondaries (READ_PROFILES of the config)
+ANALYTICS = 'analytics'
+
+# Type of a turn after it is blocked, by its type before; unblocking goes the other way around
+BLOCKED_TYPES = {None: 'BLOQUEADO',
+                 'Adultos': 'Adultos-BLOQUEADO',
+                 'Niños': 'Niños-BLOQUEADO'}
+
 PARSER = reqparse.RequestParser(bundle_errors=True)
 PARSER.add_argument('days',
                     type=str,
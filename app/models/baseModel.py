@@ -1,3 +1,4 @@
+import operator
 import uuid
 
 import datetime
@@ -6,65 +7,104 @@ from app.common.database import Database
 from app.models.users.errors import UserNotFound
 
 
+# Kinds of attribute of the serializer
+LIST = 'list'
+MODEL = 'model'
+DATETIME = 'datetime'
+VALUE = 'value'
+DATE_FORMAT = "%Y-%m-%d %H:%M"
+
+
 class BaseModel:
+    # The models keep their attributes in a __dict__, unless they declare their own __slots__, as do the models nested
+    # in the days; the attributes of a slotted model are serialized in the order of its __slots__
+    __slots__ = ()
+    FIELDS = None
+    GETTER = None
+    # Kind of every type of attribute seen by the serializer, so each value is classified with a single lookup
+    KINDS = dict()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.__dict__.get('__slots__'):
+            cls.FIELDS = tuple(cls.__slots__)
+            cls.GETTER = operator.attrgetter(*cls.FIELDS)
+
     def __init__(self, _id=None):
         self._id = uuid.uuid4().hex if _id is None else _id
 
     def json(self, exclude=None, date_to_string=True):
+        """
+        Serializes the attributes of the object: lists of models are serialized element by element, the nested
+        Location, Payment and Promotion objects are serialized unless some attribute is excluded, and datetimes are
+        formatted when date_to_string is set
+        :param exclude: The attributes to be left out
+        :param date_to_string: Whether the datetimes are formatted as strings, or kept for MongoDB
+        :return: JSON object of the attributes
+        """
+        kinds = BaseModel.KINDS
+        document = dict()
+        attributes = self.__dict__.items() if self.FIELDS is None else zip(self.FIELDS, self.GETTER(self))
+        for attrib, value in attributes:
+            if exclude and attrib in exclude:
+                continue
+            kind = kinds.get(type(value))
+            if kind is None:
+                kind = BaseModel.kind(type(value))
+            if kind is LIST:
+                document[attrib] = [element if isinstance(element, str) else element.json(date_to_string=date_to_string)
+                                    for element in value]
+            elif kind is MODEL and not exclude:
+                document[attrib] = value.json()
+            elif kind is DATETIME and date_to_string:
+                document[attrib] = value.strftime(DATE_FORMAT)
+            else:
+                document[attrib] = value
+        return document
+
+    @staticmethod
+    def raw_json(value, formats=None):
+        """
+        Converts a raw document of MongoDB straight into the JSON of its model, without building the model: every
+        datetime, at any depth, is formatted as BaseModel.json formats them
+        :param value: The raw document, or any of its values
+        :param formats: Format of the datetimes of some top level fields, for the models that format them on their own
+        :return: JSON object
+        """
+        value_type = type(value)
+        if value_type is dict:
+            document = {key: BaseModel.raw_json(element) for key, element in value.items()}
+            for key, date_format in (formats or dict()).items():
+                if type(value.get(key)) is datetime.datetime:
+                    document[key] = value.get(key).strftime(date_format)
+            return document
+        if value_type is list:
+            return [BaseModel.raw_json(element) for element in value]
+        if value_type is datetime.datetime:
+            return value.strftime(DATE_FORMAT)
+        return value
+
+    @staticmethod
+    def kind(value_type) -> str:
+        """
+        Classifies a type of attribute for the serializer, once per type
+        :param value_type: The type of the value of an attribute
+        :return: LIST, MODEL, DATETIME or VALUE
+        """
         from app.models.locations.location import Location
         from app.models.payments.payment import Payment
         from app.models.promos.promotion import Promotion
 
-        if date_to_string:
-            if exclude:
-                return {
-                    attrib: [element.json(date_to_string=date_to_string) if not isinstance(element, str) else element
-                             for
-                             element in self.__getattribute__(attrib)]
-                    if type(self.__getattribute__(attrib)) is list
-                    else self.__getattribute__(attrib).strftime("%Y-%m-%d %H:%M")
-                    if type(self.__getattribute__(attrib)) is datetime.datetime
-                    else self.__getattribute__(attrib)
-                    for attrib in self.__dict__.keys() if attrib not in exclude}
-
-            return {
-                attrib: [element.json(date_to_string=date_to_string) if not isinstance(element, str) else element for
-                         element in
-                         self.__getattribute__(attrib)]
-                if type(self.__getattribute__(attrib)) is list
-                else self.__getattribute__(attrib).json()
-                if isinstance(self.__getattribute__(attrib), Location)
-                else self.__getattribute__(attrib).json()
-                if isinstance(self.__getattribute__(attrib), Payment)
-                else self.__getattribute__(attrib).json()
-                if isinstance(self.__getattribute__(attrib), Promotion)
-                else self.__getattribute__(attrib).strftime("%Y-%m-%d %H:%M")
-                if type(self.__getattribute__(attrib)) is datetime.datetime
-                else self.__getattribute__(attrib)
-                for attrib in self.__dict__.keys()}
+        if value_type is list:
+            kind = LIST
+        elif issubclass(value_type, (Location, Payment, Promotion)):
+            kind = MODEL
+        elif value_type is datetime.datetime:
+            kind = DATETIME
         else:
-            if exclude:
-                return {
-                    attrib: [element.json(date_to_string=date_to_string) if not isinstance(element, str) else element
-                             for
-                             element in self.__getattribute__(attrib)]
-                    if type(self.__getattribute__(attrib)) is list
-                    else self.__getattribute__(attrib)
-                    for attrib in self.__dict__.keys()
-                    if attrib not in exclude}
-
-            return {
-                attrib: [element.json(date_to_string=date_to_string) if not isinstance(element, str) else element for
-                         element in self.__getattribute__(attrib)]
-                if type(self.__getattribute__(attrib)) is list
-                else self.__getattribute__(attrib).json()
-                if isinstance(self.__getattribute__(attrib), Location)
-                else self.__getattribute__(attrib).json()
-                if isinstance(self.__getattribute__(attrib), Payment)
-                else self.__getattribute__(attrib).json()
-                if isinstance(self.__getattribute__(attrib), Promotion)
-                else self.__getattribute__(attrib)
-                for attrib in self.__dict__.keys()}
+            kind = VALUE
+        BaseModel.KINDS[value_type] = kind
+        return kind
 
     def delete_from_mongo(self, collection):
         Database.remove(collection, {"_id": self._id})
@@ -76,14 +116,15 @@ class BaseModel:
         Database.insert(collection, self.json(exclude, date_to_string=False))
 
     @classmethod
-    def get_by_id(cls, _id, collection):
+    def get_by_id(cls, _id, collection, projection=None):
         """
         Returns the user object with the given id, or raises an exception if that user was not found
         :param _id: id of the user to find
         :param collection: DB that contains all the users
+        :param projection: The fields to be loaded; it must keep every field required by the constructor
         :return: user object
         """
-        user = Database.find_one(collection, {'_id': _id})
+        user = Database.find_one(collection, {'_id': _id}, projection)
         if user:
             return cls(**user)
         raise UserNotFound("El usuario con el ID dado no existe.")
@@ -0,0 +1,62 @@
+"""
+This is the base of the read-only views over the raw documents of MongoDB. A view reads its fields straight from the
+document, and builds its nested objects only when they are first accessed, so the callers that read a few fields don't
+hydrate the whole object graph. Before any write, the view is frozen into its full model.
+"""
+from abc import ABC, abstractmethod
+
+
+class BaseView(ABC):
+    __slots__ = ('document', 'nested')
+    # Builder of the nested objects of each field, which receives the list of raw documents of the field
+    NESTED = dict()
+    # Values of the fields that the model defaults when they are missing, e.g. left out by a projection
+    DEFAULTS = dict()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Every view must name its model, which is checked as soon as the view is defined
+        if getattr(cls.model, '__isabstractmethod__', False):
+            raise TypeError(f"View {cls.__name__} must define its model()")
+
+    def __init__(self, document: dict):
+        object.__setattr__(self, 'document', document)
+        object.__setattr__(self, 'nested', dict())
+
+    def __getattr__(self, name):
+        nested = self.nested.get(name)
+        if nested is not None:
+            return nested
+        if name in self.document:
+            value = self.document[name]
+        elif name in self.DEFAULTS:
+            value = self.DEFAULTS[name]
+        else:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        build = self.NESTED.get(name)
+        if build is not None and value is not None:
+            value = build(value)
+            self.nested[name] = value
+        return value
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"'{type(self).__name__}' is read-only, freeze it before changing '{name}'")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"'{type(self).__name__}' is read-only, freeze it before deleting '{name}'")
+
+    @staticmethod
+    @abstractmethod
+    def model():
+        """
+        Retrieves the class of the full model of the view
+        :return: The model class
+        """
+
+    def freeze(self):
+        """
+        Builds the full model of the document, which can be changed and saved; the model takes the document over, so
+        the view must not be used afterwards
+        :return: The model object
+        """
+        return self.model()(**self.document)
@@ -0,0 +1,193 @@
+import numpy as np
+
+from app.models.dates.constants import SCHEDULES, TURNS, POSITIONS, TYPE_CODES, TYPE_NONE, TYPE_KIDS, \
+    TYPE_BLOCKED, TYPE_OTHER
+
+"""
+This is the availability engine, which keeps the seats of a range of days in NumPy arrays of shape
+(days, schedules, turns, positions) so the status of every turn, schedule and day is computed with array operations.
+"""
+
+POSITION_KEYS = [f'pos{k}' for k in range(1, POSITIONS + 1)]
+
+
+class AvailabilityMatrix(object):
+    def __init__(self, dates, hours, turn_numbers, types, pilots, occupancy):
+        self.dates = dates
+        self.hours = hours
+        self.turn_numbers = turn_numbers
+        self.types = types
+        self.pilots = pilots
+        self.occupancy = occupancy
+
+    @staticmethod
+    def type_code(turn_type) -> int:
+        """
+        Translates the type of a turn into the numeric code used by the engine
+        :param turn_type: None, Adultos, Niños or any of them blocked
+        :return: The numeric code of the type
+        """
+        code = TYPE_CODES.get(turn_type)
+        if code is None:
+            code = TYPE_OTHER | (TYPE_BLOCKED if "BLOQUEADO" in turn_type else TYPE_NONE)
+        return code
+
+    @classmethod
+    def from_documents(cls, documents):
+        """
+        Builds the matrix in a single pass over the raw documents of the Date Collection
+        :param documents: Iterable of raw date documents, as returned by pymongo; every document must hold the same
+                          number of schedules, which may be a slice of the day
+        :return: AvailabilityMatrix object
+        """
+        dates, hours, turn_numbers, types, pilots, masks = [], [], [], [], [], []
+        for date in documents:
+            dates.append(date.get('date').strftime("%Y-%m-%d"))
+            hours.append([schedule.get('hour') for schedule in date.get('schedules')])
+            turn_numbers.append([turn.get('turn_number') for turn in date.get('schedules')[0].get('turns')])
+            for schedule in date.get('schedules'):
+                for turn in schedule.get('turns'):
+                    turn_pilots = turn.get('pilots') or []
+                    mask = turn.get('occupied')
+                    if mask is None:
+                        # Days that were not backfilled yet only hold the positions of their pilots
+                        mask = sum(1 << (pilot.get('position') - 1) for pilot in turn_pilots)
+                    types.append(cls.type_code(turn.get('type')))
+                    pilots.append(len(turn_pilots))
+                    masks.append(mask)
+        shape = (len(dates), len(hours[0]) if hours else SCHEDULES, TURNS)
+        occupancy = (np.array(masks, dtype=np.uint8)[:, None] >> np.arange(POSITIONS, dtype=np.uint8)) & 1
+        return cls(dates, hours, turn_numbers,
+                   np.array(types, dtype=np.int8).reshape(shape),
+                   np.array(pilots, dtype=np.int8).reshape(shape),
+                   occupancy.astype(bool).reshape(shape + (POSITIONS,)))
+
+    @classmethod
+    def from_summaries(cls, summaries):
+        """
+        Builds the matrix, without the positions, from the documents of the availability summary collection
+        :param summaries: Iterable of raw summary documents, as returned by pymongo
+        :return: AvailabilityMatrix object
+        """
+        dates, hours, turn_numbers, types, pilots = [], [], [], [], []
+        for summary in summaries:
+            dates.append(summary.get('date').strftime("%Y-%m-%d"))
+            hours.append([schedule.get('hour') for schedule in summary.get('schedules')])
+            turn_numbers.append([turn.get('turn_number') for turn in summary.get('schedules')[0].get('turns')])
+            for schedule in summary.get('schedules'):
+                for turn in schedule.get('turns'):
+                    types.append(turn.get('type'))
+                    pilots.append(turn.get('pilots'))
+        shape = (len(dates), SCHEDULES, TURNS)
+        return cls(dates, hours, turn_numbers,
+                   np.array(types, dtype=np.int8).reshape(shape),
+                   np.array(pilots, dtype=np.int8).reshape(shape),
+                   None)
+
+    def near_kids(self):
+        """
+        Marks the turns that are less than two turns away from a Niños race, following the order of the days,
+        schedules and turns in the matrix
+        :return: Boolean array of shape (days, schedules, turns)
+        """
+        kids = (self.types == TYPE_KIDS).ravel()
+        near = np.zeros_like(kids)
+        near[1:] |= kids[:-1]
+        near[2:] |= kids[:-2]
+        near[:-1] |= kids[1:]
+        near[:-2] |= kids[2:]
+        return near.reshape(self.types.shape)
+
+    def turns_status(self, reservation_type, total_pilots):
+        """
+        Computes the status of every turn for a reservation
+        0 - Not available
+        1 - Available, already reserved by the same type of reservation
+        2 - Completely empty
+        :param reservation_type: The type of reservation (Kids or Adults)
+        :param total_pilots: The size of the party of the reservation
+        :return: Integer array of shape (days, schedules, turns)
+        """
+        fits = (self.types == self.type_code(reservation_type)) & (self.pilots + total_pilots <= POSITIONS)
+        status = np.where(fits, 1, 0)
+        # Checks that there are at least two turns of Adults or None between Kids reservation
+        empty = self.types == TYPE_NONE
+        status[empty] = np.where(self.near_kids()[empty], 0, 2)
+        return status
+
+    @staticmethod
+    def schedules_status(turns_status):
+        """
+        Counts how many turns of each schedule are occupied
+        :param turns_status: Status of every turn, as returned by turns_status
+        :return: Integer array of shape (days, schedules)
+        """
+        busy_turns = np.count_nonzero(turns_status != 2, axis=2)
+        return np.where(busy_turns == TURNS, 0, np.where(busy_turns == 0, 2, 1))
+
+    @staticmethod
+    def dates_status(schedules_status):
+        """
+        Counts how many schedules of each day are occupied
+        :param schedules_status: Status of every schedule, as returned by schedules_status
+        :return: Integer array of shape (days,)
+        """
+        schedules = schedules_status.shape[1]
+        busy_schedules = np.count_nonzero(schedules_status == 0, axis=1)
+        empty_schedules = np.count_nonzero(schedules_status == 2, axis=1)
+        return np.where(busy_schedules == schedules, 0, np.where(empty_schedules == schedules, 2, 1))
+
+    def admin_turns_status(self):
+        """
+        Computes the status of every turn regardless of any reservation
+        0 - Blocked or full
+        1 - Partially occupied
+        2 - Completely empty
+        :return: Integer array of shape (days, schedules, turns)
+        """
+        full = ((self.types & TYPE_BLOCKED) != 0) | (self.pilots == POSITIONS)
+        return np.where(self.types == TYPE_NONE, 2, np.where(full, 0, 1))
+
+    @staticmethod
+    def rollup(status, axis):
+        """
+        Summarises the status along an axis: 0 if every item is 0, 2 if every item is 2, and 1 otherwise
+        :param status: Integer array of statuses
+        :param axis: The axis to be summarised
+        :return: Integer array without the given axis
+        """
+        return np.where((status == 0).all(axis=axis), 0, np.where((status == 2).all(axis=axis), 2, 1))
+
+    def dates_cupo(self, reservation_type, total_pilots) -> list:
+        """
+        Computes only the status of every day for a reservation
+        :param reservation_type: The type of reservation (Kids or Adults)
+        :param total_pilots: The size of the party of the reservation
+        :return: List of the status of each day, in the order of the matrix
+        """
+        return self.dates_status(self.schedules_status(self.turns_status(reservation_type, total_pilots))).tolist()
+
+    def to_dict(self, reservation_type, total_pilots) -> dict:
+        """
+        Builds the nested availability dictionary (date -> schedule -> turn -> position) with the 'cupo' keys
+        :param reservation_type: The type of reservation (Kids or Adults)
+        :param total_pilots: The size of the party of the reservation
+        :return: JSON object with dates, schedules, turns, and positions, with their status
+        """
+        turns_status = self.turns_status(reservation_type, total_pilots)
+        schedules_status = self.schedules_status(turns_status)
+        dates_status = self.dates_status(schedules_status).tolist()
+        turns_status = turns_status.tolist()
+        schedules_status = schedules_status.tolist()
+        free = (~self.occupancy).astype(np.int8).tolist()
+        availability_dict = {}
+        for d, date in enumerate(self.dates):
+            availability_dict[date] = {}
+            for s, hour in enumerate(self.hours[d]):
+                schedule = availability_dict[date][hour] = {}
+                for t, turn_number in enumerate(self.turn_numbers[d]):
+                    turn = schedule[turn_number] = dict(zip(POSITION_KEYS, free[d][s][t]))
+                    turn['cupo'] = turns_status[d][s][t]
+                schedule['cupo'] = schedules_status[d][s]
+            availability_dict[date]['cupo'] = dates_status[d]
+        return availability_dict
@@ -1,9 +1,60 @@
 import pytz
 from flask_restful import reqparse
+from pymongo import ASCENDING, IndexModel
 
 COLLECTION = 'dates'
+SUMMARY_COLLECTION = 'date_availability'
+TURNS_COLLECTION = 'date_turns'
 MEXICO_TZ = pytz.timezone('America/Mexico_City')
 
+INDEXES = {
+    COLLECTION: [IndexModel([('date', ASCENDING)], unique=True),
+                 # Used by the removal of the expired seats, and of the types of the turns left empty
+                 IndexModel([('schedules.turns.pilots.allocation_date', ASCENDING)]),
+                 IndexModel([('schedules.turns.type', ASCENDING)])],
+    SUMMARY_COLLECTION: [IndexModel([('date', ASCENDING)], unique=True)],
+    # Only used by the turns layout
+    TURNS_COLLECTION: [IndexModel([('date', ASCENDING), ('hour', ASCENDING), ('turn_number', ASCENDING)], unique=True),
+                       IndexModel([('day_id', ASCENDING)]),
+                       IndexModel([('pilots.allocation_date', ASCENDING)]),
+                       IndexModel([('type', ASCENDING)])]
+}
+
+# Layouts of the days: a document per day embedding its turns, or a document per turn
+EMBEDDED_LAYOUT = 'embedded'
+TURNS_LAYOUT = 'turns'
+
+# Layout of every day: 11 schedules (11 - 21 hrs), 5 turns per schedule and 8 positions per turn
+FIRST_SCHEDULE = 11
+SCHEDULES = 11
+TURNS = 5
+POSITIONS = 8
+
+# Optimistic writes of a turn: attempts after the first conflict, and base of the random wait between them (seconds)
+WRITE_RETRIES = 5
+RETRY_DELAY = 0.01
+WEEKDAYS = ('lunes', 'martes', 'miércoles', 'jueves', 'viernes', 'sábado', 'domingo')
+
+# Media type that selects the compact format of the available schedules, as does the query ?format=compact
+COMPACT_MIMETYPE = 'application/vnd.gokartmania.compact+json'
+
+# Numeric codes of the turn types used by the availability engine; BLOQUEADO is a flag over the other codes
+TYPE_NONE = 0
+TYPE_ADULTS = 1
+TYPE_KIDS = 2
+TYPE_BLOCKED = 4
+TYPE_OTHER = 8
+TYPE_CODES = {None: TYPE_NONE,
+              'Adultos': TYPE_ADULTS,
+              'Niños': TYPE_KIDS,
+              'BLOQUEADO': TYPE_BLOCKED,
+              'Adultos-BLOQUEADO': TYPE_ADULTS | TYPE_BLOCKED,
+              'Niños-BLOQUEADO': TYPE_KIDS | TYPE_BLOCKED}
+
+# Types of the turns that go back to no type once they are left without pilots; spelled out, rather than as the
+# types not in (None, 'BLOQUEADO'), so the removal of the expired seats can look them up in the index of the types
+RELEASED_TYPES = ['Adultos', 'Niños', 'Adultos-BLOQUEADO', 'Niños-BLOQUEADO']
+
 PARSER = reqparse.RequestParser(bundle_errors=True)
 PARSER.add_argument('year',
                     type=int,
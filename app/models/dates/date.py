@@ -1,12 +1,19 @@
 import calendar
 import datetime
+import functools
 import itertools
 from random import randint, choice
 
+from app.common.cache import Cache
 from app.common.database import Database
+from app.common.representation import Representation
 from app.models.baseModel import BaseModel
-from app.models.dates.constants import COLLECTION, MEXICO_TZ
+from app.models.dates.availability import AvailabilityMatrix
+from app.models.dates.constants import COLLECTION, MEXICO_TZ, FIRST_SCHEDULE, SCHEDULES, TURNS, POSITIONS
+from app.models.dates.storage import DateStorage
+from app.models.dates.summary import DateSummary
 from app.models.reservations.reservation import Reservation
+from app.models.schedules.errors import ScheduleNotAvailable
 
 """
 This is the date model object which will be used to insert new available dates into the database, 
@@ -15,6 +22,8 @@ and extract information about the availability of specific dates and schedules.
 
 
 class Date(BaseModel):
+    __slots__ = ('_id', 'date', 'schedules')
+
     def __init__(self, date, schedules=None, _id=None):
         from app.models.schedules.schedule import Schedule
         super().__init__(_id)
@@ -22,38 +31,74 @@ class Date(BaseModel):
         self.schedules = [Schedule(**schedule) for schedule in schedules] if schedules is not None else list()
 
     @classmethod
-    def add(cls, new_date, day):
+    def build(cls, new_date, day):
         """
-        Builds and adds a new day to the Date Collection
+        Builds a new day with its empty schedules and turns, without saving it
         :param new_date: Dictionary containing the year and month of the date to be built
         :param day: The day to be added to complete de daytime format
-        :return: A brand new datetime
+        :return: A brand new Date object
         """
         from app.models.schedules.schedule import Schedule as ScheduleModel
         aware_datetime = MEXICO_TZ.localize(datetime.datetime(new_date.get('year'), new_date.get('month'), day))
         new_day: Date = cls(date=aware_datetime, schedules=[])
-        for i in range(11, 22):
+        for i in range(FIRST_SCHEDULE, FIRST_SCHEDULE + SCHEDULES):
             ScheduleModel.add(new_day, {'hour': f'{i}', 'turns': []})
-        new_day.save_to_mongo(COLLECTION)
         return new_day
 
     @classmethod
-    def get_dates_in_range(cls, first_date, last_date):
+    def add(cls, new_date, day):
+        """
+        Builds and adds a new day to the Date Collection
+        :param new_date: Dictionary containing the year and month of the date to be built
+        :param day: The day to be added to complete de daytime format
+        :return: A brand new datetime
         """
-        Shows the date objects in the given range
+        new_day = cls.build(new_date, day)
+        DateStorage.insert([new_day.json(date_to_string=False)])
+        DateSummary.refresh(new_day)
+        return new_day
+
+    @classmethod
+    def add_month(cls, new_date) -> dict:
+        """
+        Builds every day of a month and adds them to the Date Collection in a single bulk insert; the days that
+        already exist are reported as errors, while the rest are still inserted
+        :param new_date: Dictionary containing the year and month to be built
+        :return: JSON object with the counts of the bulk insert and its errors
+        """
+        month_dates = calendar.monthrange(new_date.get('year'), new_date.get('month'))[1]
+        new_days = [cls.build(new_date, i + 1) for i in range(month_dates)]
+        result = DateStorage.insert([day.json(date_to_string=False) for day in new_days])
+        failed = [error.get('index') for error in result.get('errors')]
+        DateSummary.refresh_many([day for i, day in enumerate(new_days) if i not in failed])
+        return result
+
+    @staticmethod
+    def iter_json_in_range(first_date, last_date):
+        """
+        Converts the days in the given range straight to JSON one at a time, as they are read from the cursor, without
+        building their models
         :param first_date: The start date in range
         :param last_date: The end date in range
-        :return: JSON object with dates in range
+        :return: Generator of JSON objects, formatted as the JSON of the date objects
         """
         first_date = MEXICO_TZ.localize(datetime.datetime.strptime(first_date, "%Y-%m-%d"))
         last_date = MEXICO_TZ.localize(datetime.datetime.strptime(last_date, "%Y-%m-%d"))
-        dates = []
         query = {'date': {'$gte': first_date, '$lte': last_date}}
-        for date in Database.find(COLLECTION, query):
-            new_date: Date = cls(**date)
-            new_date.date = new_date.date.strftime("%Y-%m-%d")
-            dates.append(new_date)
-        return dates
+        cursor = DateStorage.find(query, batch_size=1)
+        return (BaseModel.raw_json(date, {'date': "%Y-%m-%d"}) for date in cursor)
+
+    @staticmethod
+    def stream_json(dates):
+        """
+        Serializes the given dates one at a time, as the elements of a JSON array
+        :param dates: Iterable of JSON objects of the dates
+        :return: Generator of the chunks of the JSON array
+        """
+        yield '['
+        for i, date in enumerate(dates):
+            yield (',' if i else '') + Representation.dumps(date)
+        yield ']'
 
     @classmethod
     def get_available_dates_user(cls, reservation: Reservation, first_date, last_date):
@@ -64,10 +109,21 @@ class Date(BaseModel):
         :param last_date: The end date in range
         :return: JSON object with dates in range with their status
         """
-        availability = cls.build_availability_dict(reservation, first_date, last_date)
-        available_dates = []
-        for date in availability:
-            available_dates.append({"fecha": date, "cupo": availability[date]['cupo']})
+        key = (first_date, last_date, reservation.type, len(reservation.pilots))
+        version = DateSummary.get_version(first_date, last_date)
+        if not DateSummary.covers(first_date, last_date, version):
+            # Falls back to the days themselves while some summaries of the range have not been built yet
+            query = {'date': {'$gte': MEXICO_TZ.localize(datetime.datetime.strptime(first_date, "%Y-%m-%d")),
+                              '$lte': MEXICO_TZ.localize(datetime.datetime.strptime(last_date, "%Y-%m-%d"))}}
+            matrix = AvailabilityMatrix.from_documents(DateStorage.find(query))
+            dates_cupo = matrix.dates_cupo(reservation.type, len(reservation.pilots))
+            return [{"fecha": date, "cupo": cupo} for date, cupo in zip(matrix.dates, dates_cupo)]
+        available_dates = Cache.get('available_dates_user', key, version)
+        if available_dates is None:
+            matrix = AvailabilityMatrix.from_summaries(DateSummary.get_summaries(first_date, last_date))
+            dates_cupo = matrix.dates_cupo(reservation.type, len(reservation.pilots))
+            available_dates = [{"fecha": date, "cupo": cupo} for date, cupo in zip(matrix.dates, dates_cupo)]
+            Cache.set('available_dates_user', key, version, available_dates)
         return available_dates
 
     @classmethod
@@ -78,74 +134,157 @@ class Date(BaseModel):
         :param last_date: The end date in range
         :return: JSON object with dates in range with their status
         """
-        dates_status = cls.build_dates_status(first_date, last_date)
-        return [{'date': date['date'], 'status': date['status']} for date in dates_status]
+        version = DateSummary.get_version(first_date, last_date)
+        if not DateSummary.covers(first_date, last_date, version):
+            # Falls back to the pipeline while some summaries of the range have not been built yet
+            return cls.build_dates_status(first_date, last_date, summary_only=True)
+        dates_status = Cache.get('available_dates_admin', (first_date, last_date), version)
+        if dates_status is None:
+            dates_status = [{'date': summary.get('date').strftime("%Y-%m-%d"), 'status': summary.get('status')}
+                            for summary in DateSummary.get_summaries(first_date, last_date)]
+            Cache.set('available_dates_admin', (first_date, last_date), version, dates_status)
+        return dates_status
 
     @classmethod
-    def get_available_schedules_user(cls, reservation: Reservation, date):
+    def get_available_schedules_user(cls, reservation: Reservation, date, compact=False):
         """
         Shows the schedule objects in the given date with the status of availability
         :param reservation: Reservation object
         :param date: The date to be processed
+        :param compact: True to encode the turns and positions of each schedule as arrays, under a layout header
         :return: JSON object with schedules, turns, and positions in the specified date with their status
         """
+        # The schedules of today depend on the current hour, and the blocked turns on the turns already reserved
+        today = datetime.datetime.now(MEXICO_TZ)
+        key = (date, reservation.type, len(reservation.pilots), today.strftime("%Y-%m-%d %H"),
+               tuple(sorted((turn.schedule, str(turn.turn_number)) for turn in reservation.turns)), compact)
+        version = DateSummary.get_version(date, date)
+        availability_arr = Cache.get('available_schedules_user', key, version)
+        if availability_arr is not None:
+            return availability_arr
         availability = cls.build_availability_dict(reservation, date, date)
         availability_arr = []
         for date in availability:
             availability[date].pop('cupo')
-            today = datetime.datetime.now(MEXICO_TZ)
             # print(today, today.hour)
             reservation_date = datetime.datetime.strptime(date, "%Y-%m-%d")
             for schedule in availability[date]:
                 if today.strftime("%Y-%m-%d") == reservation_date.strftime("%Y-%m-%d"):
                     # print(schedule)
                     if int(schedule) > today.hour+3:
-                        availability_arr.append(cls.fill_availability_arr(availability, date, schedule))
+                        availability_arr.append(cls.fill_availability_arr(availability, date, schedule, compact))
                 elif reservation_date.strftime("%Y-%m-%d") > today.strftime("%Y-%m-%d"):
-                    availability_arr.append(cls.fill_availability_arr(availability, date, schedule))
-        availability_arr = cls.block_turns_for_user(reservation, availability_arr)
+                    availability_arr.append(cls.fill_availability_arr(availability, date, schedule, compact))
+        availability_arr = cls.block_turns_for_user(reservation, availability_arr, compact)
+        if compact:
+            availability_arr = {'layout': {'turns': TURNS, 'positions': POSITIONS}, 'schedules': availability_arr}
+        Cache.set('available_schedules_user', key, version, availability_arr)
         return availability_arr
 
+    @classmethod
+    def get_turn_availability(cls, reservation: Reservation, date, schedule, turn_number) -> dict:
+        """
+        Shows the status and the taken positions of a single turn, loading only its schedule and the neighbouring
+        ones, which are needed to check the turns around Kids reservations
+        :param reservation: Reservation object
+        :param date: The date to be processed
+        :param schedule: 11 - 21 schedules in the given date
+        :param turn_number: 1 - 5 turns in the given schedule
+        :return: Turn dictionary with its status, and the mask of its taken positions once it is available
+        """
+        # Any malformed schedule, turn or date is reported as an unavailable turn
+        if not DateStorage.valid_hour(schedule) or not str(turn_number).isdigit():
+            return {"turn": turn_number, "status": 0}
+        hour = int(schedule)
+        turn_number = int(turn_number)
+        turn_availability = {"turn": turn_number, "status": 0}
+        try:
+            query = {'date': MEXICO_TZ.localize(datetime.datetime.strptime(date, "%Y-%m-%d"))}
+        except (TypeError, ValueError):
+            return turn_availability
+        today = datetime.datetime.now(MEXICO_TZ)
+        if date < today.strftime("%Y-%m-%d") or (date == today.strftime("%Y-%m-%d") and hour <= today.hour + 3):
+            return turn_availability
+
+        index = hour - FIRST_SCHEDULE
+        skip = max(index - 1, 0)
+        window_hours = [f'{FIRST_SCHEDULE + i}' for i in range(skip, min(index + 2, SCHEDULES))]
+        window = DateStorage.find_one(query, hours=window_hours)
+        hours = [item.get('hour') for item in window.get('schedules')] if window else []
+        if schedule not in hours or not 0 < turn_number <= TURNS:
+            return turn_availability
+
+        matrix = AvailabilityMatrix.from_documents([window])
+        s, t = hours.index(schedule), turn_number - 1
+        status = matrix.turns_status(reservation.type, len(reservation.pilots))[0, s, t].item()
+        # Blocks the turn if it is right before or after any turn already in the current user reservation, among the
+        # schedules still shown for the day, as block_turns_for_user does
+        first_hour = today.hour + 4 if date == today.strftime("%Y-%m-%d") else FIRST_SCHEDULE
+        schedules = tuple(f'{hour}' for hour in range(max(first_hour, FIRST_SCHEDULE), FIRST_SCHEDULE + SCHEDULES))
+        neighbours = cls.turns_neighbours(schedules, tuple(str(turn + 1) for turn in range(TURNS)))
+        for turn in reservation.turns:
+            if (schedules.index(schedule), t) in neighbours.get((turn.schedule, turn.turn_number), ()):
+                status = 0
+        turn_availability.update({"status": status,
+                                  "occupied": sum(1 << k for k, taken in enumerate(matrix.occupancy[0, s, t].tolist())
+                                                  if taken)})
+        return turn_availability
+
     @staticmethod
-    def block_turns_for_user(reservation: Reservation, availability_arr: list) -> list:
+    def block_turns_for_user(reservation: Reservation, availability_arr: list, compact=False) -> list:
         """
         Blocks the current, previous, and next turns for each turn in the current user reservation
         :param reservation: Reservation object
         :param availability_arr: Array containing status and positions for each available schedule and turn
+        :param compact: True if the schedules in the array hold their turns in the compact format
         :return: List object of availability array, updated with blocked turns
         """
-        schedule_turns = [(turn.schedule, turn.turn_number) for turn in reservation.turns]
-        # print(schedule_turns)
-
-        schedules = [x.get('schedule') for x in availability_arr]
-        turns = [str(x.get('turn')) for x in availability_arr[0].get('turns')]
-        product = list(itertools.product(schedules, turns))
-        # print(product)
-
-        result = [(product.index(x) - 1, product.index(x) + 1) for x in schedule_turns if x in product]
-        for x in result:
-            turns_to_block = product[0 if x[0] < 0 else x[0]: None if x[1] + 1 > len(product) else x[1] + 1]
-            # print(turns_to_block)
-            for schedule_turn in turns_to_block:
-                # print(schedule_turn) => ('schedule    ', 'turn')
-                for item in availability_arr:
-                    if item.get('schedule') == schedule_turn[0]:
-                        item.get('turns')[int(schedule_turn[1]) - 1].update({'status': 0})
-                        item.update({'cupo': 1})
-
+        if not availability_arr:
+            return availability_arr
+        schedules = tuple(x.get('schedule') for x in availability_arr)
+        turns = tuple(str(t + 1) for t in range(len(availability_arr[0].get('turns'))))
+        neighbours = Date.turns_neighbours(schedules, turns)
+        for turn in reservation.turns:
+            for s, t in neighbours.get((turn.schedule, turn.turn_number), ()):
+                if compact:
+                    availability_arr[s].get('turns')[t] = 0
+                else:
+                    availability_arr[s].get('turns')[t].update({'status': 0})
+                availability_arr[s].update({'cupo': 1})
         return availability_arr
 
     @staticmethod
-    def fill_availability_arr(availability, date, schedule: int) -> dict:
+    @functools.lru_cache(maxsize=64)
+    def turns_neighbours(schedules: tuple, turns: tuple) -> dict:
+        """
+        Maps every schedule-turn of a day layout to itself and its previous and next turns, following the order of
+        the schedules and turns
+        :param schedules: The hours of the available schedules, in order
+        :param turns: The turn numbers of every schedule, in order
+        :return: Dictionary from (schedule, turn) to the list of (schedule index, turn index) to be blocked
+        """
+        product = list(itertools.product(range(len(schedules)), range(len(turns))))
+        return {(schedules[s], turns[t]): product[max(i - 1, 0): i + 2] for i, (s, t) in enumerate(product)}
+
+    @staticmethod
+    def fill_availability_arr(availability, date, schedule: int, compact=False) -> dict:
         """
         Builds a schedule dictionary containing the status of the schedule, the turn and the positions
         :param availability: The dictionary of availability of all dates
         :param date: A given date by the user
         :param schedule: 11 - 21 schedules in a given date
+        :param compact: True to hold the status of the turns in an array, and the status of the positions of each
+                        turn in a string with one digit per position
         :return: A dictionary with schedules, status, and turns
         """
         turns = []
         schedule_status = availability[date][schedule].pop('cupo')
+        if compact:
+            positions = []
+            for turn in availability[date][schedule].values():
+                turns.append(turn.pop('cupo'))
+                positions.append(''.join(str(status) for status in turn.values()))
+            return {'schedule': schedule, 'cupo': schedule_status, 'turns': turns, 'positions': positions}
         for turn in availability[date][schedule]:
             turn_status = availability[date][schedule][turn].pop('cupo')
             turns.append({"turn": turn, "status": turn_status,
@@ -162,8 +301,12 @@ class Date(BaseModel):
         :param date: The date to be processed
         :return: JSON object with schedules, turns, and positions in the specified date with their status
         """
-        dates_status = cls.build_dates_status(date, date)
-        return [{'schedules': date['schedules']} for date in dates_status]
+        version = DateSummary.get_version(date, date)
+        schedules = Cache.get('available_schedules_admin', (date,), version)
+        if schedules is None:
+            schedules = [{'schedules': day['schedules']} for day in cls.build_dates_status(date, date)]
+            Cache.set('available_schedules_admin', (date,), version, schedules)
+        return schedules
 
     @classmethod
     def build_availability_dict(cls, reservation: Reservation, first_date, last_date) -> dict:
@@ -177,142 +320,91 @@ class Date(BaseModel):
         first_date = MEXICO_TZ.localize(datetime.datetime.strptime(first_date, "%Y-%m-%d"))
         last_date = MEXICO_TZ.localize(datetime.datetime.strptime(last_date, "%Y-%m-%d"))
         query = {'date': {'$gte': first_date, '$lte': last_date}}
-        total_pilots = len(reservation.pilots)
-        availability_dict = {}
-
-        # Builds an array containing only the types of the Dates in the given range
-        expressions = list()
-        expressions.append({'$match': {'date': {'$gte': first_date, '$lte': last_date}}})
-        expressions.append({'$unwind': '$schedules'})
-        expressions.append({'$unwind': '$schedules.turns'})
-        expressions.append({'$replaceRoot': {'newRoot': "$schedules.turns"}})
-        expressions.append({'$project': {'type': 1, '_id': 0}})
-        result = list(Database.aggregate(COLLECTION, expressions))
-        turn_types = [item.get('type') for item in result]
-
-        i = 0
-        for date in Database.find(COLLECTION, query):
-            new_date = cls(**date)
-            date_str = new_date.date.strftime("%Y-%m-%d")
-            availability_dict[date_str] = {}
-            busy_schedules = 0
-            empty_schedules = 0
-            # Counts how many days, schedules, and turns are occupied
-            # 0 - Completely occupied
-            # 1 - Moderately occupied
-            # 2 - Completely empty
-            for schedule in new_date.schedules:
-                availability_dict[date_str][schedule.hour] = {}
-                busy_turns = 0
-                for turn in schedule.turns:
-                    availability_dict[date_str][schedule.hour][turn.turn_number] = {}
-                    for k in range(1, 9):
-                        # Looks for any pre-occupied positions by other pilots
-                        if k in [pilot.position for pilot in turn.pilots]:
-                            availability_dict[date_str][schedule.hour][turn.turn_number][f'pos{k}'] = 0
-                        else:
-                            availability_dict[date_str][schedule.hour][turn.turn_number][f'pos{k}'] = 1
-                    # Checks that there are at least two turns of Adults or None between Kids reservation
-                    if turn.type is None:
-                        f = lambda x: 0 if x < 0 else x
-                        if "Niños" in turn_types[f(i - 2): i] + turn_types[i + 1: i + 3]:
-                            availability_dict[date_str][schedule.hour][turn.turn_number]['cupo'] = 0
-                            busy_turns += 1
-                        else:
-                            availability_dict[date_str][schedule.hour][turn.turn_number]['cupo'] = 2
-                    elif "BLOQUEADO" in turn.type:
-                        availability_dict[date_str][schedule.hour][turn.turn_number]['cupo'] = 0
-                        busy_turns += 1
-                    # Ensures that the type of the reservation matches the turn selected
-                    # and that the party size fits in that turn
-                    elif turn.type != reservation.type or total_pilots + len(turn.pilots) > 8:
-                        availability_dict[date_str][schedule.hour][turn.turn_number]['cupo'] = 0
-                        busy_turns += 1
-                    else:
-                        availability_dict[date_str][schedule.hour][turn.turn_number]['cupo'] = 1
-                        busy_turns += 1
-                    i += 1
-                if busy_turns == 5:
-                    availability_dict[date_str][schedule.hour]["cupo"] = 0
-                    busy_schedules += 1
-                elif busy_turns == 0:
-                    availability_dict[date_str][schedule.hour]["cupo"] = 2
-                    empty_schedules += 1
-                else:
-                    availability_dict[date_str][schedule.hour]["cupo"] = 1
-            if busy_schedules == 11:
-                availability_dict[date_str]["cupo"] = 0
-            elif empty_schedules == 11:
-                availability_dict[date_str]["cupo"] = 2
-            else:
-                availability_dict[date_str]["cupo"] = 1
-        return availability_dict
+        # Counts how many days, schedules, and turns are occupied
+        # 0 - Completely occupied
+        # 1 - Moderately occupied
+        # 2 - Completely empty
+        matrix = AvailabilityMatrix.from_documents(DateStorage.find(query))
+        return matrix.to_dict(reservation.type, len(reservation.pilots))
 
     @classmethod
-    def build_dates_status(cls, first_date, last_date) -> list:
+    def build_dates_status(cls, first_date, last_date, summary_only=False) -> list:
         """
-        Builds a dictionary that contains the status of availability for each day, schedule, turn, and position
+        Builds a dictionary that contains the status of availability for each day, schedule, turn, and position.
+        The status is computed by the database in an aggregation pipeline
         :param first_date: The start date in range
         :param last_date: The end date in range
+        :param summary_only: True to return only the date and its status, skipping the schedules and positions
         :return: JSON object with dates, schedules, turns, and positions in the specified range, with their status
         """
-        dates = [date.json() for date in cls.get_dates_in_range(first_date, last_date)]
-        dates_status = []
-        for date in dates:
-            schedules = []
-            for schedule in date['schedules']:
-                turns = []
-                for turn in schedule['turns']:
-                    if turn['type'] is None:
-                        turn_status = 2
-                    else:
-                        if 'BLOQUEADO' in turn['type'] or len(turn['pilots']) == 8:
-                            turn_status = 0
-                        else:
-                            turn_status = 1
-                    positions = []
-                    for k in range(1, 9):
-                        # Looks for any pre-occupied positions by other pilots
-                        if k in [pilot['position'] for pilot in turn['pilots']]:
-                            position_status = 0
-                        else:
-                            position_status = 1
-                        positions.append({"position": k, "status": position_status})
-                    turns.append({"turn": turn['turn_number'], "type": turn['type'],
-                                  "status": turn_status, "positions": positions})
-                # Counts how many schedules are occupied
-                # 0 - Completely occupied
-                # 1 - Moderately occupied
-                # 2 - Completely empty
-                if len(list(filter(lambda race: race['status'] == 0, turns))) == 5:
-                    schedule_status = 0
-                elif len(list(filter(lambda race: race['status'] == 2, turns))) == 5:
-                    schedule_status = 2
-                else:
-                    schedule_status = 1
-                schedules.append({'schedule': schedule['hour'], 'status': schedule_status, 'turns': turns})
-            if len(list(filter(lambda day: day['status'] == 0, schedules))) == 11:
-                date_status = 0
-            elif len(list(filter(lambda day: day['status'] == 2, schedules))) == 11:
-                date_status = 2
-            else:
-                date_status = 1
-            dates_status.append({'date': date['date'], 'status': date_status, 'schedules': schedules})
-        return dates_status
+        first_date = MEXICO_TZ.localize(datetime.datetime.strptime(first_date, "%Y-%m-%d"))
+        last_date = MEXICO_TZ.localize(datetime.datetime.strptime(last_date, "%Y-%m-%d"))
+        # Counts how many turns, schedules and days are occupied
+        # 0 - Completely occupied
+        # 1 - Moderately occupied
+        # 2 - Completely empty
+        turn_status = {"$cond": [{"$eq": [{"$ifNull": ["$$turn.type", None]}, None]}, 2,
+                                 {"$cond": [{"$or": [{"$gte": [{"$indexOfCP": ["$$turn.type", "BLOQUEADO"]}, 0]},
+                                                     {"$eq": [{"$size": {"$ifNull": ["$$turn.pilots", []]}},
+                                                              POSITIONS]}]}, 0, 1]}]}
+        turn = {"turn": "$$turn.turn_number", "type": "$$turn.type", "status": turn_status}
+        if not summary_only:
+            # Looks for any pre-occupied positions by other pilots
+            turn["positions"] = {"$map": {
+                "input": {"$range": [1, POSITIONS + 1]},
+                "as": "position",
+                "in": {"position": "$$position",
+                       "status": {"$cond": [{"$in": ["$$position",
+                                                     {"$ifNull": ["$$turn.pilots.position", []]}]}, 0, 1]}}
+            }}
+        expressions = DateStorage.pipeline({"date": {"$gte": first_date, "$lte": last_date}})
+        expressions.append({"$sort": {"date": 1}})
+        expressions.append({"$project": {
+            "_id": 0,
+            "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$date", "timezone": MEXICO_TZ.zone}},
+            "schedules": {"$map": {
+                "input": "$schedules",
+                "as": "schedule",
+                "in": {"$let": {
+                    "vars": {"turns": {"$map": {"input": "$$schedule.turns", "as": "turn", "in": turn}}},
+                    "in": {"schedule": "$$schedule.hour",
+                           "status": cls.rollup_expression("$$turns.status"),
+                           "turns": "$$turns"}
+                }}
+            }}
+        }})
+        expressions.append({"$addFields": {"status": cls.rollup_expression("$schedules.status")}})
+        if summary_only:
+            expressions.append({"$project": {"date": 1, "status": 1}})
+        else:
+            expressions.append({"$project": {"date": 1, "status": 1, "schedules": 1}})
+        return list(Database.aggregate(COLLECTION, expressions))
+
+    @staticmethod
+    def rollup_expression(statuses) -> dict:
+        """
+        Builds the aggregation expression that summarises a list of statuses: 0 if every item is 0, 2 if every
+        item is 2, and 1 otherwise
+        :param statuses: The aggregation expression of the list of statuses
+        :return: Aggregation expression
+        """
+        return {"$cond": [{"$eq": [{"$max": statuses}, 0]}, 0,
+                          {"$cond": [{"$eq": [{"$min": statuses}, 2]}, 2, 1]}]}
 
     @classmethod
-    def auto_fill(cls, first_date, last_date) -> None:
+    def auto_fill(cls, first_date, last_date) -> dict:
         """
         Automatically fills all dates in the given range with random turns and pilots, for testing only
         :param first_date: The start date in range
         :param last_date: The end date in range
-        :return: None
+        :return: JSON object with the counts of the bulk write of the days
         """
         first_date = MEXICO_TZ.localize(datetime.datetime.strptime(first_date, "%Y-%m-%d"))
         last_date = MEXICO_TZ.localize(datetime.datetime.strptime(last_date, "%Y-%m-%d"))
         query = {'date': {'$gte': first_date, '$lte': last_date}}
         from app.models.pilots.pilot import AbstractPilot
-        for date in Database.find(COLLECTION, query):
+        new_dates = []
+        for date in DateStorage.find(query):
             new_date = cls(**date)
             i = 0
             arr = []
@@ -332,9 +424,13 @@ class Date(BaseModel):
                     else:
                         turn.type = 'Adultos'
                     arr.append(turn.type)
+                    turn.version += 1
                     i += 1
             # print(arr)
-            new_date.update_mongo(COLLECTION)
+            new_dates.append(new_date)
+        result = DateStorage.replace([new_date.json(date_to_string=False) for new_date in new_dates])
+        DateSummary.refresh_many(new_dates)
+        return result
 
     @classmethod
     def update_temp(cls, allocation_date, new_turn, reservation_type, is_user: bool) -> None:
@@ -344,46 +440,57 @@ class Date(BaseModel):
         :param reservation_type: The type of reservation (Kids or Adults)
         :param allocation_date: The momentary date when the reservation will be occupied
         :param new_turn: The information of the turn
-        :return: None
+        :return: None, or positions not available anymore error if another reservation claimed them first
         """
         from app.models.pilots.pilot import AbstractPilot
-        first_date = MEXICO_TZ.localize(datetime.datetime.strptime(allocation_date, "%Y-%m-%d"))
-        last_date = MEXICO_TZ.localize(datetime.datetime.strptime(allocation_date, "%Y-%m-%d"))
-        query = {'date': {'$gte': first_date, '$lte': last_date}}
-        updated_date = cls(**Database.find(COLLECTION, query)[0])
-        for schedule in updated_date.schedules:
-            if schedule.hour == new_turn.get('schedule'):
-                turn_number = int(new_turn.get('turn_number'))
-                for position in new_turn.get('positions'):
-                    position_num = (int(position[-1]))
-                    now = datetime.datetime.now(MEXICO_TZ)
-                    if is_user:
-                        AbstractPilot.add(schedule.turns[turn_number - 1],
-                                          {'_id': new_turn.get('positions').get(position),
-                                           'position': position_num,
-                                           'allocation_date': now})
-                    else:  # is_admin
-                        AbstractPilot.add(schedule.turns[turn_number - 1],
-                                          {'_id': new_turn.get('positions').get(position),
-                                           'position': position_num,
-                                           'allocation_date': None})
-                # Update the type of turn, if it's None
-                if schedule.turns[turn_number - 1].type is None:
-                    schedule.turns[turn_number - 1].type = reservation_type
-                updated_date.update_mongo(COLLECTION)
+        date = MEXICO_TZ.localize(datetime.datetime.strptime(allocation_date, "%Y-%m-%d"))
+        now = datetime.datetime.now(MEXICO_TZ) if is_user else None
+        pilots = [AbstractPilot(_id=pilot_id, position=int(position[-1]), allocation_date=now)
+                  for position, pilot_id in new_turn.get('positions').items()]
+        claimed = cls.claim_seats(date, new_turn.get('schedule'), int(new_turn.get('turn_number')), pilots,
+                                  reservation_type, is_user)
+        if not claimed:
+            raise ScheduleNotAvailable("Las posiciones que seleccionaste ya no se encuentran disponibles.")
+        DateSummary.refresh_dates({'date': date})
 
     @staticmethod
-    def insert_dates() -> str:
+    def claim_seats(date, schedule: str, turn_number: int, pilots: list, reservation_type, is_user: bool) -> bool:
         """
-        Adds to the Date Collection a whole month, taking into account the last month in the collection
+        Atomically adds the pilots to a turn, only if all of their positions are still free, with a conditional
+        update on the day document, or on the turn document in the turns layout
+        :param date: The aware datetime of the day
+        :param schedule: 11 - 21 schedules in a given date
+        :param turn_number: 1 - 5 turns in the given schedule
+        :param pilots: AbstractPilot objects holding the positions to be claimed
+        :param reservation_type: The type of reservation (Kids or Adults), set to the turn if it was empty
+        :param is_user: Indicates whether the operation is being held by the user or the administrator
+        :return: True if the seats were claimed, False if any of them was taken by someone else (conflict)
+        """
+        from app.models.turns.turn import AbstractTurn
+        occupied = AbstractTurn.positions_mask(pilot.position for pilot in pilots)
+        held = AbstractTurn.positions_mask(pilot.position for pilot in pilots if pilot.allocation_date is not None)
+        return DateStorage.claim(date, schedule, turn_number, [pilot.json(date_to_string=False) for pilot in pilots],
+                                 occupied, held, reservation_type, is_user)
+
+    @staticmethod
+    def refresh_masks(query: dict) -> None:
+        """
+        Rebuilds the occupied and held masks of every turn in the days matching the given query, after their pilots
+        were changed directly in the collection
+        :param query: The query that pymongo will process
         :return: None
         """
+        DateStorage.refresh_masks(query)
+
+    @staticmethod
+    def insert_dates() -> tuple:
+        """
+        Adds to the Date Collection a whole month, taking into account the last month in the collection
+        :return: The inserted month, and the JSON object with the counts of the bulk insert
+        """
         expressions = list()
         expressions.append({"$group": {"_id": None, "maxDate": {"$max": "$date"}}})
         result = list(Database.aggregate(COLLECTION, expressions))
         now = result[0].get('maxDate') + datetime.timedelta(days=1)
-        month_dates = calendar.monthrange(now.year, now.month)[1]
-        for i in range(month_dates):
-            Date.add({'year': now.year, 'month': now.month}, i + 1)
-        return now.month
+        return now.month, Date.add_month({'year': now.year, 'month': now.month})
 
@@ -11,3 +11,7 @@ class DateNotFound(DateErrors):
 
 class DateNotAvailable(DateErrors):
     pass
+
+
+class DateConflict(DateErrors):
+    pass
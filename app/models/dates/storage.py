@@ -0,0 +1,529 @@
+import collections
+import itertools
+import random
+import time
+
+import pytz
+from pymongo import UpdateMany, UpdateOne
+
+from app.common.database import Database
+from app.models.dates.constants import COLLECTION, TURNS_COLLECTION, FIRST_SCHEDULE, SCHEDULES, POSITIONS, \
+    EMBEDDED_LAYOUT, TURNS_LAYOUT, WRITE_RETRIES, RETRY_DELAY, WEEKDAYS, RELEASED_TYPES
+from app.models.dates.errors import DateConflict
+from config import Config
+
+"""
+This is the storage of the days. With the embedded layout every day is a single document holding its schedules, turns,
+and pilots. With the turns layout the Date Collection only keeps each day and its schedules, while every turn is a
+document of its own in the Turns Collection, so a seat change writes just the turn it touches. Either way the days are
+read back as the same documents, so the models never depend on the layout.
+"""
+
+# Fields that a turn document copies from its day and schedule
+TURN_KEYS = ('day_id', 'date', 'schedule_id', 'hour')
+
+
+class DateStorage(object):
+    LAYOUT = Config.DATES_LAYOUT
+    STATS = collections.Counter()
+    HOTSPOTS = collections.Counter()
+
+    @staticmethod
+    def initialize(layout=EMBEDDED_LAYOUT) -> None:
+        """
+        Chooses the layout of the days
+        :param layout: 'embedded' for a document per day, or 'turns' for a document per turn
+        :return: None
+        """
+        DateStorage.LAYOUT = layout or EMBEDDED_LAYOUT
+
+    @staticmethod
+    def turns_layout() -> bool:
+        """
+        Verifies if every turn is a document of its own
+        :return: True or False, depending on the layout
+        """
+        return DateStorage.LAYOUT == TURNS_LAYOUT
+
+    @staticmethod
+    def turns_query(query: dict) -> dict:
+        """
+        Translates a query on the days to a query on their turns
+        :param query: The query that pymongo will process, using only the _id and date of the days
+        :return: The query on the Turns Collection
+        """
+        return {('day_id' if key == '_id' else key): value for key, value in query.items()}
+
+    @staticmethod
+    def split(date: dict) -> tuple:
+        """
+        Splits a day document into the day with its schedules, and the documents of its turns
+        :param date: Raw date document, or the JSON of a Date object with its dates as datetime
+        :return: The day without turns, and the list of turn documents
+        """
+        schedules, turns = list(), list()
+        for schedule in date.get('schedules'):
+            schedules.append({'_id': schedule.get('_id'), 'hour': schedule.get('hour')})
+            for turn in schedule.get('turns', []):
+                turns.append(dict(turn, day_id=date.get('_id'), date=date.get('date'),
+                                  schedule_id=schedule.get('_id'), hour=schedule.get('hour')))
+        return dict(date, schedules=schedules), turns
+
+    @staticmethod
+    def assemble(day: dict, turns: list, hours=None) -> dict:
+        """
+        Puts the turn documents of a day back into its schedules
+        :param day: Day document without turns
+        :param turns: The turn documents of the day, sorted by schedule and turn number
+        :param hours: The hours of the schedules to be kept; all of them by default
+        :return: Day document, as in the embedded layout
+        """
+        schedule_turns = {hour: [{key: value for key, value in turn.items() if key not in TURN_KEYS}
+                                 for turn in group]
+                          for hour, group in itertools.groupby(turns, key=lambda turn: turn.get('hour'))}
+        schedules = [dict(schedule, turns=schedule_turns.get(schedule.get('hour'), []))
+                     for schedule in day.get('schedules')
+                     if hours is None or schedule.get('hour') in hours]
+        return dict(day, schedules=schedules)
+
+    @staticmethod
+    def merge(days, turns, hours=None):
+        """
+        Assembles the days one at a time, walking along both cursors, which must be sorted by date
+        :param days: Cursor of day documents without turns
+        :param turns: Cursor of turn documents, sorted by date, schedule, and turn number
+        :param hours: The hours of the schedules to be kept; all of them by default
+        :return: Generator of day documents, as in the embedded layout
+        """
+        groups = itertools.groupby(turns, key=lambda turn: turn.get('date'))
+        group = next(groups, None)
+        for day in days:
+            while group is not None and group[0] < day.get('date'):
+                group = next(groups, None)
+            day_turns = list(group[1]) if group is not None and group[0] == day.get('date') else []
+            yield DateStorage.assemble(day, day_turns, hours)
+
+    @staticmethod
+    def find(query: dict, hours=None, fields=None, batch_size=0):
+        """
+        Finds the days matching the query, as documents of the embedded layout
+        :param query: The query that pymongo will process, using only the _id and date of the days
+        :param hours: Consecutive hours of the only schedules to be loaded; all of them by default
+        :param fields: The only fields of the turns to be loaded; all of them by default. It can't be used along with
+                       the hours
+        :param batch_size: Number of days per batch of the cursor; the server default if 0
+        :return: Iterable of day documents
+        """
+        if not DateStorage.turns_layout():
+            return Database.find(COLLECTION, query, DateStorage.projection(hours, fields)).batch_size(batch_size)
+        days = Database.find(COLLECTION, query).sort('date', 1).batch_size(batch_size)
+        turns_query = DateStorage.turns_query(query)
+        if hours:
+            turns_query['hour'] = {'$in': list(hours)}
+        projection = dict.fromkeys(TURN_KEYS + ('turn_number',) + tuple(fields), 1) if fields else None
+        turns = Database.find(TURNS_COLLECTION, turns_query, projection).sort([('date', 1), ('hour', 1),
+                                                                               ('turn_number', 1)])
+        return DateStorage.merge(days, turns, hours)
+
+    @staticmethod
+    def count(query: dict) -> int:
+        """
+        Counts the days matching the query, which are kept in the Date Collection with either layout
+        :param query: The query that pymongo will process, using only the _id and date of the days
+        :return: The number of days
+        """
+        return Database.DATABASE[COLLECTION].count_documents(query, session=Database.session())
+
+    @staticmethod
+    def find_one(query: dict, hours=None, fields=None):
+        """
+        Finds the first day matching the query, as a document of the embedded layout
+        :param query: The query that pymongo will process, using only the _id and date of the days
+        :param hours: Consecutive hours of the only schedules to be loaded; all of them by default
+        :param fields: The only fields of the turns to be loaded; all of them by default
+        :return: Day document, or None if no day matches the query
+        """
+        if not DateStorage.turns_layout():
+            return Database.find_one(COLLECTION, query, DateStorage.projection(hours, fields))
+        return next(iter(DateStorage.find(query, hours, fields)), None)
+
+    @staticmethod
+    def valid_hour(hour) -> bool:
+        """
+        Verifies if the given hour is one of the schedules of every day, before loading it by its position
+        :param hour: The hour of the schedule, as received in the request
+        :return: True or False, depending on the hour
+        """
+        return isinstance(hour, str) and hour.isdigit() and FIRST_SCHEDULE <= int(hour) < FIRST_SCHEDULE + SCHEDULES
+
+    @staticmethod
+    def projection(hours=None, fields=None):
+        """
+        Builds the projection of the embedded layout that loads only the given schedules or turn fields
+        :param hours: Consecutive hours of the only schedules to be loaded
+        :param fields: The only fields of the turns to be loaded
+        :return: Projection for pymongo, or None to load the whole days
+        """
+        if hours:
+            return {'date': 1, 'schedules': {'$slice': [int(hours[0]) - FIRST_SCHEDULE, len(hours)]}}
+        if fields:
+            projection = {'date': 1, 'schedules._id': 1, 'schedules.hour': 1, 'schedules.turns.turn_number': 1}
+            projection.update({f'schedules.turns.{field}': 1 for field in fields})
+            return projection
+        return None
+
+    @staticmethod
+    def pipeline(match: dict) -> list:
+        """
+        Builds the first stages of an aggregation over the days, which output documents of the embedded layout
+        :param match: The query of the $match stage, using only the _id and date of the days
+        :return: List of aggregation stages
+        """
+        expressions = list()
+        expressions.append({"$match": match})
+        if DateStorage.turns_layout():
+            expressions.append({"$lookup": {
+                "from": TURNS_COLLECTION,
+                "let": {"day_id": "$_id"},
+                "pipeline": [{"$match": {"$expr": {"$eq": ["$day_id", "$$day_id"]}}},
+                             {"$sort": {"hour": 1, "turn_number": 1}}],
+                "as": "turns"
+            }})
+            expressions.append({"$addFields": {"schedules": {"$map": {
+                "input": "$schedules",
+                "as": "schedule",
+                "in": {"_id": "$$schedule._id",
+                       "hour": "$$schedule.hour",
+                       "turns": {"$filter": {"input": "$turns", "as": "turn",
+                                             "cond": {"$eq": ["$$turn.hour", "$$schedule.hour"]}}}}
+            }}}})
+            expressions.append({"$project": {"turns": 0}})
+        return expressions
+
+    @staticmethod
+    def insert(dates: list) -> dict:
+        """
+        Inserts new days in a single bulk write; the turns of the days that failed aren't inserted
+        :param dates: List of JSON of Date objects, with their dates as datetime
+        :return: JSON object with the counts of the days inserted and their errors
+        """
+        if not DateStorage.turns_layout():
+            return Database.insert_many(COLLECTION, dates)
+        days, turns = zip(*[DateStorage.split(date) for date in dates]) if dates else ((), ())
+        result = Database.insert_many(COLLECTION, list(days))
+        failed = [error.get('index') for error in result.get('errors')]
+        Database.insert_many(TURNS_COLLECTION, [turn for i, day_turns in enumerate(turns) if i not in failed
+                                                for turn in day_turns])
+        return result
+
+    @staticmethod
+    def replace(dates: list) -> dict:
+        """
+        Replaces whole days, inserting the ones that don't exist, in a single bulk write
+        :param dates: List of JSON of Date objects, with their dates as datetime
+        :return: JSON object with the counts of the bulk write of the days
+        """
+        if not DateStorage.turns_layout():
+            return Database.upsert_many(COLLECTION, dates)
+        days, turns = zip(*[DateStorage.split(date) for date in dates]) if dates else ((), ())
+        result = Database.upsert_many(COLLECTION, list(days))
+        Database.upsert_many(TURNS_COLLECTION, [turn for day_turns in turns for turn in day_turns])
+        return result
+
+    @staticmethod
+    def turn_request(day_id, hour: str, turn: dict, version: int) -> UpdateOne:
+        """
+        Builds the write that replaces a single turn of a day, which only matches it while it is still in the version
+        that was read
+        :param day_id: The id of the day
+        :param hour: The hour of the schedule of the turn
+        :param turn: The JSON of the AbstractTurn object, with its dates as datetime and its new version
+        :param version: The version of the turn when it was read
+        :return: The UpdateOne operation, on the Date Collection or the Turns Collection depending on the layout
+        """
+        # The turns saved before the versions existed have no version field, which matches None
+        expected = {'$in': [0, None]} if version == 0 else version
+        if not DateStorage.turns_layout():
+            return UpdateOne({'_id': day_id}, {'$set': {'schedules.$[s].turns.$[t]': turn}},
+                             array_filters=[{'s.hour': hour},
+                                            {'t.turn_number': turn.get('turn_number'), 't.version': expected}])
+        return UpdateOne({'_id': turn.get('_id'), 'version': expected},
+                         {'$set': {key: value for key, value in turn.items() if key != '_id'}})
+
+    @staticmethod
+    def save_turns(requests: list) -> dict:
+        """
+        Sends the writes of several turns in a single bulk write
+        :param requests: List of writes built by DateStorage.turn_request
+        :return: JSON object with the counts of the bulk write; a turn that someone else wrote meanwhile is not
+                 modified (conflict)
+        """
+        return Database.bulk_write(TURNS_COLLECTION if DateStorage.turns_layout() else COLLECTION, requests)
+
+    @staticmethod
+    def save_turn(day_id, hour: str, turn: dict, version: int) -> bool:
+        """
+        Replaces a single turn of a day, only if it is still in the version that was read
+        :param day_id: The id of the day
+        :param hour: The hour of the schedule of the turn
+        :param turn: The JSON of the AbstractTurn object, with its dates as datetime and its new version
+        :param version: The version of the turn when it was read
+        :return: True if the turn was replaced, False if someone else wrote it meanwhile (conflict)
+        """
+        return DateStorage.save_turns([DateStorage.turn_request(day_id, hour, turn, version)]).get('modified') == 1
+
+    @staticmethod
+    def find_turns(query: dict, turns_query: dict = None):
+        """
+        Finds the turns of the days matching the given query
+        :param query: The query that pymongo will process over the days
+        :param turns_query: The same query over the Turns Collection; by default the query is translated
+        :return: Generator of tuples with the id of the day, the hour of the schedule, and the raw turn document
+        """
+        if not DateStorage.turns_layout():
+            for date in Database.find(COLLECTION, query):
+                for schedule in date.get('schedules', []):
+                    for turn in schedule.get('turns', []):
+                        yield date.get('_id'), schedule.get('hour'), turn
+            return
+        for turn in Database.find(TURNS_COLLECTION, DateStorage.turns_query(query) if turns_query is None
+                                  else turns_query):
+            yield turn.get('day_id'), turn.get('hour'), {key: value for key, value in turn.items()
+                                                         if key not in TURN_KEYS}
+
+    @staticmethod
+    def update_turn(query: dict, hour: str, turn_number: int, change) -> tuple:
+        """
+        Reads a turn, changes it, and writes it back only if no one else wrote it meanwhile. On a conflict the turn is
+        read again and the change is retried, after a random wait that grows with every attempt
+        :param query: The query of the day, using only its _id and date
+        :param hour: The hour of the schedule of the turn
+        :param turn_number: 1 - 5 turns in the given schedule
+        :param change: Function that modifies the given AbstractTurn object, and returns the result to be kept
+        :return: The id of the day and the result of the change, or None and None if the turn doesn't exist
+        """
+        from app.models.turns.turn import AbstractTurn
+        for attempt in range(WRITE_RETRIES + 1):
+            if attempt:
+                DateStorage.STATS['retries'] += 1
+                time.sleep(random.uniform(0, RETRY_DELAY * 2 ** attempt))
+            date = DateStorage.find_one(query, hours=[hour])
+            document = next((turn for schedule in (date or {}).get('schedules', []) if schedule.get('hour') == hour
+                             for turn in schedule.get('turns') if turn.get('turn_number') == turn_number), None)
+            if document is None:
+                return None, None
+            turn = AbstractTurn(**document)
+            version = turn.version
+            result = change(turn)
+            turn.version = version + 1
+            DateStorage.STATS['writes'] += 1
+            if DateStorage.save_turn(date.get('_id'), hour, turn.json(date_to_string=False), version):
+                return date.get('_id'), result
+            DateStorage.STATS['conflicts'] += 1
+            DateStorage.HOTSPOTS[f"{WEEKDAYS[date.get('date').weekday()]} {hour}:00"] += 1
+        DateStorage.STATS['exhausted'] += 1
+        raise DateConflict("El turno está siendo modificado por alguien más, por favor intenta de nuevo.")
+
+    @staticmethod
+    def concurrency_stats() -> dict:
+        """
+        Counts the optimistic writes of the turns in the current worker, and where their conflicts happen
+        :return: JSON object with the writes, conflicts, retries and exhausted retries, and the 10 schedules of the
+                 week with more conflicts
+        """
+        stats = {key: DateStorage.STATS[key] for key in ('writes', 'conflicts', 'retries', 'exhausted')}
+        stats['hotspots'] = dict(DateStorage.HOTSPOTS.most_common(10))
+        return stats
+
+    @staticmethod
+    def claim(date, schedule: str, turn_number: int, pilots: list, occupied: int, held: int, reservation_type,
+              is_user: bool) -> bool:
+        """
+        Atomically adds the pilots to a turn, only if all of their positions are still free
+        :param date: The aware datetime of the day
+        :param schedule: 11 - 21 schedules in a given date
+        :param turn_number: 1 - 5 turns in the given schedule
+        :param pilots: The JSON of the AbstractPilot objects, with their dates as datetime
+        :param occupied: The mask of the positions of the pilots
+        :param held: The mask of the positions of the pilots still waiting for their payment
+        :param reservation_type: The type of reservation (Kids or Adults), set to the turn if it was empty
+        :param is_user: Indicates whether the operation is being held by the user or the administrator
+        :return: True if the seats were claimed, False if any of them was taken by someone else (conflict)
+        """
+        if not DateStorage.turns_layout():
+            turn_filter = {'t.turn_number': turn_number, 't.occupied': {'$bitsAllClear': occupied}}
+            if is_user:
+                # Users can only join empty turns or turns of their same type; blocked turns are never matched
+                turn_filter['t.type'] = {'$in': [None, reservation_type]}
+            # Update the type of turn, if it's None
+            empty_turn_filter = {'e.turn_number': turn_number, 'e.type': None,
+                                 'e.occupied': {'$bitsAllClear': occupied}}
+            result = Database.update_one(COLLECTION, {'date': date},
+                                         {'$push': {'schedules.$[s].turns.$[t].pilots': {'$each': pilots}},
+                                          '$bit': {'schedules.$[s].turns.$[t].occupied': {'or': occupied},
+                                                   'schedules.$[s].turns.$[t].held': {'or': held}},
+                                          '$inc': {'schedules.$[s].turns.$[t].version': 1},
+                                          '$set': {'schedules.$[s].turns.$[e].type': reservation_type}},
+                                         array_filters=[{'s.hour': schedule}, turn_filter, empty_turn_filter])
+            return result.modified_count == 1
+        query = {'date': date, 'hour': schedule, 'turn_number': turn_number, 'occupied': {'$bitsAllClear': occupied}}
+        update = {'$push': {'pilots': {'$each': pilots}},
+                  '$bit': {'occupied': {'or': occupied}, 'held': {'or': held}},
+                  '$inc': {'version': 1}}
+        # An empty turn takes the type of the reservation
+        result = Database.update_one(TURNS_COLLECTION, dict(query, type=None),
+                                     dict(update, **{'$set': {'type': reservation_type}}))
+        if result.modified_count == 1:
+            return True
+        # Users can only join turns of their same type; blocked turns are never matched
+        query['type'] = reservation_type if is_user else {'$ne': None}
+        return Database.update_one(TURNS_COLLECTION, query, update).modified_count == 1
+
+    @staticmethod
+    def confirm_seats(query: dict, turns: list) -> dict:
+        """
+        Clears the allocation date of the given pilots in several turns of a day, in a single bulk write, so their
+        seats are no longer held
+        :param query: The query over the date of the day
+        :param turns: List of tuples with the hour, the turn number, the ids of the pilots, and the mask of their
+                      positions in each turn
+        :return: JSON object with the matched and modified counts of the bulk write, and its errors
+        """
+        full = (1 << POSITIONS) - 1
+        if not DateStorage.turns_layout():
+            requests = [UpdateOne(query,
+                                  {'$set': {'schedules.$[s].turns.$[t].pilots.$[p].allocation_date': None},
+                                   '$bit': {'schedules.$[s].turns.$[t].held': {'and': full ^ mask}},
+                                   '$inc': {'schedules.$[s].turns.$[t].version': 1}},
+                                  array_filters=[{'s.hour': hour}, {'t.turn_number': turn_number},
+                                                 {'p._id': {'$in': pilot_ids}}])
+                        for hour, turn_number, pilot_ids, mask in turns]
+            return Database.bulk_write(COLLECTION, requests)
+        requests = [UpdateOne(dict(query, hour=hour, turn_number=turn_number),
+                              {'$set': {'pilots.$[p].allocation_date': None},
+                               '$bit': {'held': {'and': full ^ mask}},
+                               '$inc': {'version': 1}},
+                              array_filters=[{'p._id': {'$in': pilot_ids}}])
+                    for hour, turn_number, pilot_ids, mask in turns]
+        return Database.bulk_write(TURNS_COLLECTION, requests)
+
+    @staticmethod
+    def set_types(days: list, hours: list, turn_numbers: list, types: dict) -> dict:
+        """
+        Changes the type of the given turns, in a single bulk write
+        :param days: List of aware datetimes of the days
+        :param hours: List of hours of the schedules
+        :param turn_numbers: List of turn numbers
+        :param types: Dictionary with the new type of the turns, by their current type
+        :return: JSON object with the matched and modified counts of the bulk write, and its errors
+        """
+        if not DateStorage.turns_layout():
+            requests = [UpdateMany({'date': {"$in": days}},
+                                   {'$set': {'schedules.$[s].turns.$[t].type': new_type},
+                                    '$inc': {'schedules.$[s].turns.$[t].version': 1}},
+                                   array_filters=[{'s.hour': {'$in': hours}},
+                                                  {'t.turn_number': {'$in': turn_numbers}, 't.type': old_type}])
+                        for old_type, new_type in types.items()]
+            return Database.bulk_write(COLLECTION, requests)
+        requests = [UpdateMany({'date': {"$in": days}, 'hour': {'$in': hours}, 'turn_number': {'$in': turn_numbers},
+                                'type': old_type},
+                               {'$set': {'type': new_type}, '$inc': {'version': 1}})
+                    for old_type, new_type in types.items()]
+        return Database.bulk_write(TURNS_COLLECTION, requests)
+
+    @staticmethod
+    def remove_expired(timeout) -> list:
+        """
+        Removes the pilots whose allocation date is older than the timeout, and empties the type of the turns left
+        without pilots. Only the turns that change are written, each one only if it is still in the version that was
+        read, so a seat claimed meanwhile is never released; the turns in conflict are read again and retried
+        :param timeout: The oldest allocation date to be kept, as a UTC datetime
+        :return: List of ids of the days whose seats or types changed
+        """
+        from app.models.turns.turn import AbstractTurn
+        if timeout.tzinfo is None:
+            timeout = pytz.utc.localize(timeout)
+        query = {'$or': [{'schedules.turns.pilots.allocation_date': {'$lte': timeout}},
+                         {'schedules.turns': {'$elemMatch': {'pilots': [], 'type': {'$in': RELEASED_TYPES}}}}]}
+        turns_query = {'$or': [{'pilots.allocation_date': {'$lte': timeout}},
+                               {'pilots': [], 'type': {'$in': RELEASED_TYPES}}]}
+        days = set()
+        for attempt in range(WRITE_RETRIES + 1):
+            requests = list()
+            for day_id, hour, document in DateStorage.find_turns(query, turns_query):
+                turn = AbstractTurn(**document)
+                pilots = [pilot for pilot in turn.pilots
+                          if pilot.allocation_date is None or pilot.allocation_date > timeout]
+                empty = not pilots and turn.type in RELEASED_TYPES
+                if len(pilots) == len(turn.pilots) and not empty:
+                    continue
+                version = turn.version
+                turn.pilots = pilots
+                if empty:
+                    turn.type = None
+                turn.version = version + 1
+                requests.append(DateStorage.turn_request(day_id, hour, turn.json(date_to_string=False), version))
+                days.add(day_id)
+            if not requests:
+                break
+            DateStorage.STATS['writes'] += len(requests)
+            conflicts = len(requests) - DateStorage.save_turns(requests).get('modified')
+            if not conflicts:
+                break
+            DateStorage.STATS['conflicts'] += conflicts
+        return list(days)
+
+    @staticmethod
+    def refresh_masks(query: dict, turns_query: dict = None) -> dict:
+        """
+        Rebuilds the occupied and held masks of the turns in the days matching the given query. Only the turns whose
+        masks are stale are written, each one only if it is still in the version that was read
+        :param query: The query that pymongo will process over the days
+        :param turns_query: The same query over the Turns Collection; by default the query is translated
+        :return: JSON object with the counts of the bulk write
+        """
+        from app.models.turns.turn import AbstractTurn
+        requests = list()
+        for day_id, hour, document in DateStorage.find_turns(query, turns_query):
+            turn = AbstractTurn(**document)
+            if document.get('occupied') == turn.occupied and document.get('held') == turn.held:
+                continue
+            version = turn.version
+            turn.version = version + 1
+            requests.append(DateStorage.turn_request(day_id, hour, turn.json(date_to_string=False), version))
+        return DateStorage.save_turns(requests)
+
+    @staticmethod
+    def backfill_masks() -> dict:
+        """
+        Builds the masks of the turns saved before the masks existed, since the seats of a turn can only be claimed
+        once its occupied mask is saved
+        :return: JSON object with the counts of the bulk write
+        """
+        return DateStorage.refresh_masks({'schedules.turns.occupied': {'$exists': False}},
+                                         {'occupied': {'$exists': False}})
+
+    @staticmethod
+    def migrate(layout: str) -> int:
+        """
+        Moves every day to the given layout; it must run while the application is stopped
+        :param layout: 'turns' to split the days into a document per turn, or 'embedded' to put the turns back
+        :return: The number of days migrated
+        """
+        migrated = 0
+        if layout == TURNS_LAYOUT:
+            for date in Database.find(COLLECTION, {'schedules.turns': {'$exists': True}}):
+                day, turns = DateStorage.split(date)
+                Database.upsert_many(TURNS_COLLECTION, turns)
+                Database.update_one(COLLECTION, {'_id': day.get('_id')}, {'$set': {'schedules': day.get('schedules')}})
+                migrated += 1
+        elif layout == EMBEDDED_LAYOUT:
+            query = {'schedules.turns': {'$exists': False}}
+            days = Database.find(COLLECTION, query).sort('date', 1)
+            turns = Database.find(TURNS_COLLECTION, {}).sort([('date', 1), ('hour', 1), ('turn_number', 1)])
+            for date in DateStorage.merge(days, turns):
+                Database.update_one(COLLECTION, {'_id': date.get('_id')},
+                                    {'$set': {'schedules': date.get('schedules')}})
+                Database.remove(TURNS_COLLECTION, {'day_id': date.get('_id')})
+                migrated += 1
+        return migrated
@@ -0,0 +1,131 @@
+import datetime
+
+from pymongo import UpdateOne
+
+from app.common.database import Database
+from app.models.dates.availability import AvailabilityMatrix
+from app.models.dates.constants import SUMMARY_COLLECTION, MEXICO_TZ, POSITIONS
+from app.models.dates.storage import DateStorage
+
+"""
+This is the availability summary of each day, a compact copy of the Date Collection holding only the status and
+free seats of every schedule and turn. It is refreshed on every seat write, so the calendars never read whole days.
+"""
+
+
+class DateSummary(object):
+    @staticmethod
+    def build(date: dict) -> dict:
+        """
+        Builds the summary document of a day
+        :param date: Raw date document, or the JSON of a Date object with its dates as datetime
+        :return: Summary document, without its version, along with the sum of the versions of the turns it was built
+                 from
+        """
+        matrix = AvailabilityMatrix.from_documents([date])
+        turns_status = matrix.admin_turns_status()
+        schedules_status = AvailabilityMatrix.rollup(turns_status, axis=2)
+        date_status = AvailabilityMatrix.rollup(schedules_status, axis=1).tolist()[0]
+        free = (POSITIONS - matrix.occupancy.sum(axis=3)).tolist()[0]
+        types = matrix.types.tolist()[0]
+        pilots = matrix.pilots.tolist()[0]
+        turns_status = turns_status.tolist()[0]
+        schedules_status = schedules_status.tolist()[0]
+        schedules = []
+        for s, hour in enumerate(matrix.hours[0]):
+            turns = [{'turn_number': turn_number,
+                      'type': types[s][t],
+                      'pilots': pilots[s][t],
+                      'free': free[s][t],
+                      'status': turns_status[s][t]}
+                     for t, turn_number in enumerate(matrix.turn_numbers[0])]
+            schedules.append({'hour': hour, 'status': schedules_status[s], 'turns': turns})
+        # Every write of a turn bumps its version, so their sum only grows as the day changes
+        turns_version = sum(turn.get('version') or 0 for schedule in date.get('schedules')
+                            for turn in schedule.get('turns'))
+        return {'_id': date.get('_id'), 'date': date.get('date'), 'status': date_status, 'schedules': schedules,
+                'turns_version': turns_version}
+
+    @classmethod
+    def refresh(cls, date) -> None:
+        """
+        Rewrites the summary of a day after any of its seats, types or blocks changed, and bumps its version
+        :param date: Date object that was just written to the Date Collection
+        :return: None
+        """
+        cls.save([cls.build(date.json(date_to_string=False))])
+
+    @classmethod
+    def refresh_many(cls, dates) -> dict:
+        """
+        Rewrites the summaries of several days in a single bulk write, and bumps their versions
+        :param dates: List of Date objects that were just written to the Date Collection
+        :return: JSON object with the counts of the bulk write
+        """
+        return cls.save([cls.build(date.json(date_to_string=False)) for date in dates])
+
+    @classmethod
+    def refresh_dates(cls, query: dict) -> dict:
+        """
+        Rewrites the summaries of every day in the Date Collection matching the given query
+        :param query: The query that pymongo will process
+        :return: JSON object with the counts of the bulk write
+        """
+        return cls.save([cls.build(date) for date in DateStorage.find(query)])
+
+    @staticmethod
+    def save(summaries: list) -> dict:
+        """
+        Upserts the given summaries in a single bulk write, bumping the version of each one. A summary is only written
+        if it was built from a newer state of its day than the saved one, so a stale snapshot never overwrites it
+        :param summaries: List of summary documents, as built by DateSummary.build
+        :return: JSON object with the counts of the bulk write; the stale summaries are reported as duplicate key
+                 errors of their upserts
+        """
+        requests = [UpdateOne({'_id': summary.pop('_id'),
+                               '$or': [{'turns_version': {'$lt': summary.get('turns_version')}},
+                                       {'turns_version': {'$exists': False}}]},
+                              {'$set': summary, '$inc': {'version': 1}}, upsert=True)
+                    for summary in summaries]
+        return Database.bulk_write(SUMMARY_COLLECTION, requests)
+
+    @staticmethod
+    def covers(first_date, last_date, version: tuple) -> bool:
+        """
+        Verifies if every day in the range has its summary, since the summaries of a day are only written when it
+        changes or when they are built by hand
+        :param first_date: The start date in range
+        :param last_date: The end date in range
+        :param version: The version of the summaries of the range, as returned by DateSummary.get_version
+        :return: True or False, depending on whether the summaries can stand for the whole range
+        """
+        first_date = MEXICO_TZ.localize(datetime.datetime.strptime(first_date, "%Y-%m-%d"))
+        last_date = MEXICO_TZ.localize(datetime.datetime.strptime(last_date, "%Y-%m-%d"))
+        return len(version) == DateStorage.count({'date': {'$gte': first_date, '$lte': last_date}})
+
+    @staticmethod
+    def get_version(first_date, last_date) -> tuple:
+        """
+        Retrieves the version of every day in the given range, which changes on every write to any of them
+        :param first_date: The start date in range
+        :param last_date: The end date in range
+        :return: Tuple with the id and version of each day, sorted by date
+        """
+        first_date = MEXICO_TZ.localize(datetime.datetime.strptime(first_date, "%Y-%m-%d"))
+        last_date = MEXICO_TZ.localize(datetime.datetime.strptime(last_date, "%Y-%m-%d"))
+        query = {'date': {'$gte': first_date, '$lte': last_date}}
+        summaries = Database.DATABASE[SUMMARY_COLLECTION].find(query, {'version': 1}).sort('date', 1)
+        return tuple((summary.get('_id'), summary.get('version')) for summary in summaries)
+
+    @staticmethod
+    def get_summaries(first_date, last_date):
+        """
+        Retrieves the summaries of the days in the given range, sorted by date
+        :param first_date: The start date in range
+        :param last_date: The end date in range
+        :return: Cursor of summary documents
+        """
+        first_date = MEXICO_TZ.localize(datetime.datetime.strptime(first_date, "%Y-%m-%d"))
+        last_date = MEXICO_TZ.localize(datetime.datetime.strptime(last_date, "%Y-%m-%d"))
+        query = {'date': {'$gte': first_date, '$lte': last_date}}
+        return Database.find(SUMMARY_COLLECTION, query).sort('date', 1)
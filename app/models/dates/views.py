@@ -0,0 +1,49 @@
+from app.models.baseView import BaseView
+
+"""
+These are the read-only views of the days, their schedules and their turns, for the callers that only read a few
+fields of a day; the pilots of a turn are built as full models once they are accessed.
+"""
+
+
+def build_pilots(pilots: list) -> list:
+    """
+    Builds the pilots of a turn
+    :param pilots: The raw documents of the pilots
+    :return: List of AbstractPilot objects
+    """
+    from app.models.pilots.pilot import AbstractPilot
+    return [AbstractPilot(**pilot) for pilot in pilots]
+
+
+class TurnView(BaseView):
+    __slots__ = ()
+    NESTED = {'pilots': build_pilots}
+    DEFAULTS = {'type': None, 'pilots': [], 'occupied': 0, 'held': 0, 'version': 0}
+
+    @staticmethod
+    def model():
+        from app.models.turns.turn import AbstractTurn
+        return AbstractTurn
+
+
+class ScheduleView(BaseView):
+    __slots__ = ()
+    NESTED = {'turns': lambda turns: [TurnView(turn) for turn in turns]}
+    DEFAULTS = {'turns': []}
+
+    @staticmethod
+    def model():
+        from app.models.schedules.schedule import Schedule
+        return Schedule
+
+
+class DateView(BaseView):
+    __slots__ = ()
+    NESTED = {'schedules': lambda schedules: [ScheduleView(schedule) for schedule in schedules]}
+    DEFAULTS = {'schedules': []}
+
+    @staticmethod
+    def model():
+        from app.models.dates.date import Date
+        return Date
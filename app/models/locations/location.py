@@ -1,3 +1,9 @@
+import copy
+import threading
+import time
+
+from pymongo.errors import PyMongoError
+
 from app.common.database import Database
 from app.models.baseModel import BaseModel
 from app.models.emails.email import Email
@@ -6,6 +12,7 @@ from app.models.locations.constants import COLLECTION
 from app.models.admins.constants import COLLECTION as ADMINS, SUPERADMINS
 from app.models.locations.errors import LocationNotFound
 from app.models.users.user import User
+from config import Config
 
 """
 This is the location model object which will be used to append new locations to both the reservation
@@ -15,12 +22,100 @@ and the schedule, depending the POST method.
 
 class Location(BaseModel):
     from app.models.reservations.reservation import Reservation
+    # Copy of the locations collection, and the price tables parsed from it, refreshed once the TTL expires
+    CACHE = dict()
+    PRICES = dict()
+    LOADED = None
+    TTL = Config.LOCATIONS_TTL
+    LOCK = threading.Lock()
 
     def __init__(self, name, type, _id=None):
         super().__init__(_id)
         self.name = name
         self.type = type
 
+    @staticmethod
+    def initialize(ttl=None) -> None:
+        """
+        Sets the time during which the cached locations are served
+        :param ttl: Seconds after which the locations are read again from the database; LOCATIONS_TTL by default
+        :return: None
+        """
+        Location.TTL = Config.LOCATIONS_TTL if ttl is None else ttl
+        Location.invalidate()
+
+    @staticmethod
+    def invalidate() -> None:
+        """
+        Discards the cached locations of the current worker, so the next read loads them again
+        :return: None
+        """
+        with Location.LOCK:
+            Location.LOADED = None
+
+    @staticmethod
+    def load() -> dict:
+        """
+        Retrieves the cached locations, reading the whole collection again if the cache expired or was invalidated
+        :return: JSON object with the document of each location, by its id
+        """
+        with Location.LOCK:
+            if Location.LOADED is None or time.monotonic() - Location.LOADED > Location.TTL:
+                Location.CACHE = {location.get('_id'): location for location in Database.find(COLLECTION, {})}
+                Location.PRICES = {_id: Location.parse_prices(location.get('type'))
+                                   for _id, location in Location.CACHE.items()}
+                Location.LOADED = time.monotonic()
+            return Location.CACHE
+
+    @staticmethod
+    def warm_up() -> None:
+        """
+        Loads the locations when the worker starts, so its first reservation doesn't wait for them
+        :return: None
+        """
+        try:
+            Location.load()
+        except PyMongoError as e:
+            print(e.__repr__())
+
+    @staticmethod
+    def parse_prices(prices: dict) -> dict:
+        """
+        Parses the price table of a location
+        :param prices: The type of the location, with the GOKART and CADET prices per number of races, and the LICENCIA
+                       price
+        :return: JSON object with the license price, and the prices per number of races of each reservation type
+        """
+        return {'license': prices.get('LICENCIA'),
+                'Adultos': tuple(prices.get('GOKART') or ()),
+                'Niños': tuple(prices.get('CADET') or ())}
+
+    @classmethod
+    def get(cls, _id) -> 'Location':
+        """
+        Retrieves a location from the cache, loading it if needed
+        :param _id: The ID of the location
+        :return: Location object, or None if it doesn't exist
+        """
+        location = cls.load().get(_id)
+        if location is None:
+            # The location could have been added by another worker after the cache was loaded
+            cls.invalidate()
+            location = cls.load().get(_id)
+        return cls(**copy.deepcopy(location)) if location is not None else None
+
+    @classmethod
+    def prices(cls, location: 'Location') -> dict:
+        """
+        Retrieves the parsed price table of a location, reusing the cached one while its prices are the same
+        :param location: Location object, such as the copy embedded in a reservation
+        :return: JSON object with the license price, and the prices per number of races of each reservation type
+        """
+        cached = cls.load().get(location._id)
+        if cached is not None and cached.get('type') == location.type:
+            return cls.PRICES.get(location._id)
+        return cls.parse_prices(location.type)
+
     @classmethod
     def add(cls, new_location):
         """
@@ -30,6 +125,7 @@ class Location(BaseModel):
         """
         location: Location = cls(**new_location)
         location.save_to_mongo(COLLECTION)
+        cls.invalidate()
         return location
 
     @classmethod
@@ -40,12 +136,12 @@ class Location(BaseModel):
         :return: List of Location objects or one specific Location object
         """
         if _id is None:
-            return [cls(**location) for location in Database.find(COLLECTION, {})]
+            return [cls(**copy.deepcopy(location)) for location in cls.load().values()]
         else:
-            location = Database.find_one(COLLECTION, {'_id': _id})
+            location = cls.get(_id)
             if location is None:
                 raise LocationNotFound("La ubicacion con el ID dado no existe.")
-            return [cls(**location)]
+            return [location]
 
     @classmethod
     def update(cls, updated_location):
@@ -59,6 +155,7 @@ class Location(BaseModel):
             raise LocationNotFound("La ubicacion con el ID dado no existe.")
         location: Location = cls(**updated_location)
         location.update_mongo(COLLECTION)
+        cls.invalidate()
         return location
 
     @staticmethod
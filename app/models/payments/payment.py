@@ -4,6 +4,7 @@ import json
 import datetime
 
 from flask import session
+from app.common.database import Database
 from app.models.dates.constants import MEXICO_TZ
 from app.models.promos.errors import PromotionUsed
 from app.models.promos.promotion import Promotion as PromoModel
@@ -214,6 +215,7 @@ class Payment(BaseModel):
         payment.amount = amount
         payment.license_price = license_price
         payment.date = MEXICO_TZ.localize(datetime.datetime.now())
+        promo_document = None
         if promo:
             # Cambiar el status de la promoción utilizada
             for c in promo.coupons:
@@ -224,7 +226,7 @@ class Payment(BaseModel):
                     if coupon.copies_left == 0:
                         coupon.status = False
                     promo.coupons.append(coupon)
-                    promo.update_mongo(PROMO_COLLECTION)
+                    promo_document = promo.json(date_to_string=False)
                     break
             del promo.coupons
             promo.coupon_applied = coupon._id
@@ -233,16 +235,23 @@ class Payment(BaseModel):
         if session.get('reservation_date') != datetime.datetime.strftime(reservation.date, "%Y-%m-%d"):
             aware_datetime = datetime.datetime.strptime(session.get('reservation_date'), "%Y-%m-%d")
             reservation.date = aware_datetime
-        for pilot in reservation.pilots:
-            pilot.update_mongo(PILOTS)
-        # Guardar en la coleccion de reservaciones reales
-        reservation.save_to_mongo(COLLECTION)
-        # Borrar de la coleccion de reservaciones temporales
-        reservation.delete_from_mongo(COLLECTION_TEMP)
-        # Nulificar las fechas tentativas de reservacion
-        for turn in reservation.turns:
-            TurnModel.remove_allocation_dates(reservation, turn, remove_type="allocation_date")
-        # Agregar la reservación al usuario
         user.reservations.append(reservation._id)
-        user.update_mongo(USER)
+
+        def commit():
+            if promo_document is not None:
+                Database.update(PROMO_COLLECTION, {'_id': promo_document.get('_id')}, promo_document)
+            Database.upsert_many(PILOTS, [pilot.json(date_to_string=False) for pilot in reservation.pilots])
+            # Guardar en la coleccion de reservaciones reales
+            reservation.save_to_mongo(COLLECTION)
+            # Borrar de la coleccion de reservaciones temporales
+            reservation.delete_from_mongo(COLLECTION_TEMP)
+            # Nulificar las fechas tentativas de reservacion
+            TurnModel.confirm_allocation_dates(reservation)
+            # Agregar la reservación al usuario
+            user.update_mongo(USER)
+
+        # Todas las escrituras se confirman juntas, o ninguna si alguna falla
+        Database.run_in_transaction(commit)
+        # Los resúmenes de los días se reescriben fuera de la transacción, que un resumen más reciente abortaría
+        TurnModel.refresh_summaries(reservation)
         return payment
@@ -1,7 +1,12 @@
 from flask_restful import reqparse
+from pymongo import ASCENDING, IndexModel
 
 COLLECTION = 'pilots'
 
+INDEXES = {
+    COLLECTION: [IndexModel([('location', ASCENDING)])]
+}
+
 PARSER = reqparse.RequestParser(bundle_errors=True)
 PARSER.add_argument('name',
                     type=str,
@@ -7,9 +7,10 @@ from app.models.emails.errors import EmailErrors, FailedToSendEmail
 from app.models.pilots.errors import PilotNotFound
 from app.models.pilots.constants import COLLECTION as PILOTS
 from app.models.reservations.constants import COLLECTION_TEMP, TIMEOUT
-from app.models.dates.constants import COLLECTION
+from app.models.dates.storage import DateStorage
 from app.models.reservations.reservation import Reservation
 from app.models.dates.date import Date as DateModel
+from app.models.dates.summary import DateSummary
 
 """
 This is the pilot model object which holds the information of the pilot if they have a licence.
@@ -50,10 +51,10 @@ class Pilot(BaseModel):
         :param pilot_id: The id of the pilot to be read from the reservation
         :return: The requested pilot
         """
-        pilot = list(Database.find(PILOTS, {"_id": pilot_id}))
-        if pilot is None or pilot == []:
+        pilot = Database.find_one(PILOTS, {"_id": pilot_id})
+        if pilot is None:
             raise PilotNotFound("El piloto con el ID dado no existe")
-        return pilot[0]
+        return BaseModel.raw_json(pilot)
 
     @classmethod
     def update(cls, updated_pilot, pilot_id):
@@ -63,8 +64,8 @@ class Pilot(BaseModel):
         :param pilot_id: the ID of the pilot to be updated
         :return: All the pilots of the current reservation, with updated data
         """
-        pilot = list(Database.find(PILOTS, {"_id": pilot_id}))
-        if pilot is None or pilot == []:
+        pilot = Database.find_one(PILOTS, {"_id": pilot_id}, {"_id": 1})
+        if pilot is None:
             raise PilotNotFound("El piloto con el ID dado no existe")
         new_pilot: Pilot = cls(**updated_pilot, _id=pilot_id)
         new_pilot.update_mongo(PILOTS)
@@ -78,11 +79,10 @@ class Pilot(BaseModel):
         :param pilot_id: The id of the pilot to be deleted from the reservation
         :return: The remaining pilots of the reservation
         """
-        pilot = list(Database.find(PILOTS, {"_id": pilot_id}))
-        if pilot is None or pilot == []:
+        pilot = Database.find_one(PILOTS, {"_id": pilot_id}, {"_id": 1})
+        if pilot is None:
             raise PilotNotFound("El piloto con el ID dado no existe")
-        bye_pilot: Pilot = cls(**pilot[0])
-        bye_pilot.delete_from_mongo(PILOTS)
+        Database.remove(PILOTS, {"_id": pilot_id})
 
     @staticmethod
     def send_confirmation_message(reservation: Reservation, qr_code=None) -> None:
@@ -266,6 +266,7 @@ class Pilot(BaseModel):
 
 class AbstractPilot(BaseModel):
     from app.models.turns.turn import AbstractTurn
+    __slots__ = ('_id', 'position', 'allocation_date')
 
     def __init__(self, position, allocation_date, _id=None):
         super().__init__(_id)
@@ -291,11 +292,7 @@ class AbstractPilot(BaseModel):
         :return: None
         """
         timeout = datetime.datetime.utcnow() - datetime.timedelta(minutes=15)
-        Database.DATABASE[COLLECTION].update_many({},
-                                                  {'$pull': {'schedules.$[].turns.$[].pilots': {
-                                                      'allocation_date': {'$lte': timeout}}}})
-
-        Database.DATABASE[COLLECTION].update_many({},
-                                                  {'$set': {'schedules.$[].turns.$[tu].type': None}},
-                                                  array_filters=[{'$and': [{'tu.pilots': []},
-                                                                           {'tu.type': {'$ne': "BLOQUEADO"}}]}])
+        # Keeps the days whose seats or types change, so their summaries can be refreshed
+        days = DateStorage.remove_expired(timeout)
+        if days:
+            DateSummary.refresh_dates({'_id': {'$in': days}})
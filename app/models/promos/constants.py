@@ -1,7 +1,12 @@
 from flask_restful import reqparse
+from pymongo import ASCENDING, IndexModel
 
 COLLECTION = 'promos'
 
+INDEXES = {
+    COLLECTION: [IndexModel([('coupons._id', ASCENDING)])]
+}
+
 PARSER = reqparse.RequestParser(bundle_errors=True)
 PARSER.add_argument('existence',
                     type=int,
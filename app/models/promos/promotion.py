@@ -48,13 +48,11 @@ class Coupons(BaseModel):
         :param coupon_id: ID of the coupon
         :return: Coupon information or error message if either promotion or coupon does not exist
         """
-        promo = Database.find_one(COLLECTION, {'_id': promo_id})
+        promo = Database.find_one(COLLECTION, {'_id': promo_id}, {'coupons': {'$elemMatch': {'_id': coupon_id}}})
         if promo is None:
             raise PromotionNotFound("La promoción con el ID dado no existe.")
-        promotion = Promotion(**promo)
-        for coupon in promotion.coupons:
-            if coupon._id == coupon_id:
-                return coupon
+        for coupon in promo.get('coupons', []):
+            return Coupons(**coupon)
         raise CouponNotFound("El cupón con el ID dado no existe.")
 
 
@@ -148,8 +146,9 @@ class Promotion(BaseModel):
         :param promo_id: The ID of the coupon to be found
         :return: Dictionary with the promo object and the coupon document, or Promo error
         """
-        for promo in Database.DATABASE['promos'].find({'type': {'$regex': promo_id[-10:-6].title()}}):
-            coupon = list(filter(lambda c: c['_id'] == promo_id, promo.get('coupons')))
+        # The promotion is loaded with all of its coupons, since the callers build and may save the whole promotion
+        for promo in Database.DATABASE[COLLECTION].find({'coupons._id': promo_id}):
+            coupon = [c for c in promo.get('coupons') if c.get('_id') == promo_id]
             if coupon:
                 authorised = promo.get('authorised')
                 if authorised:
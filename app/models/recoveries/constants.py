@@ -1 +1,8 @@
+from pymongo import ASCENDING, IndexModel
+
 COLLECTION = 'recoveries'
+
+INDEXES = {
+    COLLECTION: [IndexModel([('admin_email', ASCENDING)])]
+}
+
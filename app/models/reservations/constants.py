@@ -1,9 +1,19 @@
 import datetime
 from flask_restful import reqparse
+from pymongo import ASCENDING, IndexModel
 
 COLLECTION_TEMP = 'temp_reservations'
 COLLECTION = 'real_reservations'
 
+# Temporary reservations are not expired by a TTL index, since their dates are saved as naive local times
+INDEXES = {
+    COLLECTION: [IndexModel([('date', ASCENDING)]),
+                 IndexModel([('turns._id', ASCENDING)]),
+                 # Used by the report of the promotions applied in a date range
+                 IndexModel([('date', ASCENDING), ('discount', ASCENDING)])],
+    COLLECTION_TEMP: [IndexModel([('date', ASCENDING)])]
+}
+
 TIMEOUT = datetime.timedelta(minutes=15)
 
 PARSER = reqparse.RequestParser(bundle_errors=True)
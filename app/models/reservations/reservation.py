@@ -8,8 +8,6 @@ from app.models.promos.errors import InvalidPromotion
 from app.models.promos.promotion import Promotion as PromoModel, Coupons
 from app.common.database import Database
 from app.models.reservations.constants import COLLECTION_TEMP, TIMEOUT, COLLECTION as REAL_RESERVATIONS
-from app.models.locations.constants import COLLECTION
-from app.models.promos.constants import COLLECTION as PROMO_COLLECTION
 from app.models.reservations.errors import ReservationNotFound, WrongReservationType
 
 """
@@ -61,14 +59,14 @@ class Reservation(BaseModel):
         from app.models.locations.location import Location as LocationModel
 
         id_location = new_reservation.pop('id_location')
-        location = Database.find_one(COLLECTION, {'_id': id_location})
+        location = LocationModel.get(id_location)
         if location is None:
             raise LocationNotFound("La sucursal con este ID no fue encontrada.")
         now = datetime.datetime.now()
         aware_datetime = MEXICO_TZ.localize(now)
         reservation: Reservation = cls(**new_reservation, date=now)
         # print(reservation.date)
-        reservation.location = LocationModel(**location)
+        reservation.location = location
         if reservation.type != "Niños" and reservation.type != "Adultos":
             raise WrongReservationType("Error en el tipo de reservacion. Solo puede ser 'Adultos' o 'Niños'.")
         reservation.save_to_mongo(COLLECTION_TEMP)
@@ -124,34 +122,46 @@ class Reservation(BaseModel):
                 raise ReservationNotFound("La reservacion con el ID dado no existe.")
 
     @classmethod
-    def get_by_id(cls, _id, collection):
+    def get_by_id(cls, _id, collection, projection=None):
         """
         Returns the reservation object with the given id, or raises an exception if that reservation was not found
         :param _id: ID of the reservation to find
         :param collection: DB that contains all the reservations
+        :param projection: The fields to be loaded; it must keep the type and date of the reservation
         :return: Reservation object
         """
         if collection == "real_reservations":
-            reservation = Database.find_one(collection, {'_id': _id}, tz_aware=False)
+            reservation = Database.find_one(collection, {'_id': _id}, projection, tz_aware=False)
         else:
-            reservation = Database.find_one(collection, {'_id': _id})
+            reservation = Database.find_one(collection, {'_id': _id}, projection)
         if reservation:
             reservation_obj: Reservation = cls(**reservation)
             return reservation_obj
         raise ReservationNotFound("La reservacion con el ID dado no existe.")
 
+    @staticmethod
+    def get_json(_id, collection, projection=None) -> dict:
+        """
+        Converts the reservation with the given id straight to JSON, without building its model, for the read-only
+        endpoints
+        :param _id: ID of the reservation to find
+        :param collection: DB that contains all the reservations
+        :param projection: The fields to be loaded
+        :return: JSON object of the reservation, formatted as the JSON of the reservation object
+        """
+        tz_aware = collection != REAL_RESERVATIONS
+        reservation = Database.find_one(collection, {'_id': _id}, projection, tz_aware=tz_aware)
+        if reservation:
+            return BaseModel.raw_json(reservation)
+        raise ReservationNotFound("La reservacion con el ID dado no existe.")
+
     @classmethod
     def remove_temporal_reservations(cls) -> None:
         """
         Removes those reservations from the Temp Reservation Collection that have expired their TIMEOUT
         :return: None
         """
-        for temp_reservation in Database.find(COLLECTION_TEMP, {}):
-            reservation = cls(**temp_reservation)
-            now = datetime.datetime.now(MEXICO_TZ)
-            delta = now - reservation.date
-            if delta > TIMEOUT:
-                reservation.delete_from_mongo(COLLECTION_TEMP)
+        Database.remove(COLLECTION_TEMP, {'date': {'$lt': datetime.datetime.now(MEXICO_TZ) - TIMEOUT}})
 
     def calculate_price(self):
         """
@@ -159,14 +169,12 @@ class Reservation(BaseModel):
         :return: Reservation object
         """
         from app.models.payments.payment import Payment
-        location = self.location
+        from app.models.locations.location import Location
+        price_table = Location.prices(self.location)
         licensed_pilots = [pilot.licensed for pilot in self.pilots].count(True)
-        license_price = licensed_pilots * location.type.get('LICENCIA')
+        license_price = licensed_pilots * price_table.get('license')
         # This needs to be modified in Tlalnepantla for it has a third type Kartito, for babies
-        if self.type == "Adultos":
-            prices = location.type.get('GOKART')
-        else:
-            prices = location.type.get('CADET')
+        prices = price_table.get('Adultos') if self.type == "Adultos" else price_table.get('Niños')
         prices_size = len(prices)
 
         self.total_races = len(self.turns)
@@ -198,13 +206,11 @@ class Reservation(BaseModel):
         self.coupon_id = coupon._id
 
         from app.models.payments.payment import Payment
-        location = self.location
+        from app.models.locations.location import Location
+        price_table = Location.prices(self.location)
         licensed_pilots = [pilot.licensed for pilot in self.pilots].count(True)
-        license_price = licensed_pilots * location.type.get('LICENCIA')
-        if self.type == "Adultos":
-            prices = location.type.get('GOKART')
-        else:
-            prices = location.type.get('CADET')
+        license_price = licensed_pilots * price_table.get('license')
+        prices = price_table.get('Adultos') if self.type == "Adultos" else price_table.get('Niños')
         prices_size = len(prices)
         turns_size = len(self.turns)
         pilots_size = len(self.pilots)
@@ -240,7 +246,6 @@ class Reservation(BaseModel):
         elif promotion.get('promo').get('type') == 'Reservación':
             self.discount = self.turns_price
             turns_price = 0
-        promo.update_mongo(PROMO_COLLECTION)
         self.license_price = license_price
         self.turns_price = turns_price
         self.price_per_race = self.turns_price / self.total_races / self.total_pilots
@@ -7,6 +7,8 @@ This is the reservation schedule object which will be used to insert 5 turns and
 
 
 class Schedule(BaseModel):
+    __slots__ = ('_id', 'hour', 'turns')
+
     def __init__(self, hour, turns=None, _id=None):
         from app.models.turns.turn import AbstractTurn
         super().__init__(_id)
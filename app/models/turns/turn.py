@@ -3,8 +3,11 @@ import datetime
 from flask import session
 from app.common.database import Database
 from app.models.baseModel import BaseModel
-from app.models.dates.constants import COLLECTION, MEXICO_TZ
+from app.models.dates.constants import MEXICO_TZ
 from app.models.dates.errors import DateNotAvailable
+from app.models.dates.storage import DateStorage
+from app.models.dates.views import DateView
+from app.models.dates.summary import DateSummary
 from app.models.reservations.constants import COLLECTION_TEMP, COLLECTION as REAL_RESERVATIONS
 from app.models.reservations.reservation import Reservation
 from app.models.schedules.errors import ScheduleNotAvailable
@@ -47,10 +50,10 @@ class Turn(BaseModel):
         :param turn_id: The id of the turn to be read from the reservation
         :return: The requested turn
         """
-        turn = list(Database.find(REAL_RESERVATIONS, {'turns._id': turn_id}))
-        if turn is None or turn == []:
+        reservation = Database.find_one(REAL_RESERVATIONS, {'turns._id': turn_id}, {'turns.$': 1})
+        if reservation is None:
             raise TurnNotFound("El turno con el ID dado no existe")
-        return list(filter(lambda x: x.get('_id') == turn_id, turn[0].get('turns')))[0]
+        return BaseModel.raw_json(reservation.get('turns')[0])
 
     @classmethod
     def check_and_add(cls, reservation: Reservation, new_turn):
@@ -60,18 +63,13 @@ class Turn(BaseModel):
         :param new_turn: Turn information
         :return: None, or schedule/turn not available anymore message
         """
-        available_schedules = DateModel.get_available_schedules_user(reservation, new_turn.get('date'))
-        still_available = cls.check_turn_availability(available_schedules, new_turn)
+        turn_availability = DateModel.get_turn_availability(reservation, new_turn.get('date'),
+                                                            new_turn.get('schedule'), new_turn.get('turn_number'))
         # Verifies that the turn is is still available
-        if still_available:
-            turn_positions = \
-                list(filter(lambda schedule: schedule['schedule'] == new_turn.get('schedule'), available_schedules))[
-                    0].get(
-                    'turns')[int(new_turn.get('turn_number')) - 1].get('positions')
-            user_positions = new_turn.get('positions')
+        if turn_availability.get('status'):
+            user_positions = AbstractTurn.positions_mask(position[-1] for position in new_turn.get('positions'))
             # Verifies that the positions selected are still available
-            positions_available = cls.check_positions_availability(turn_positions, user_positions)
-            if positions_available:
+            if not turn_availability.get('occupied') & user_positions:
                 allocation_date = new_turn.get('date')
                 DateModel.update_temp(allocation_date, new_turn, reservation.type, True)
                 if reservation.turns != [] and reservation.turns is not None and reservation.turns[0].turn_number == 0:
@@ -109,21 +107,6 @@ class Turn(BaseModel):
                 raise ScheduleNotAvailable("El horario que seleccionaste no se encuentra disponible por el momento.")
         return list(filter(lambda x: x.get('schedule') == new_turn.get('schedule'), available_schedules))[0].get('cupo')
 
-    @staticmethod
-    def check_turn_availability(available_schedules, new_turn) -> int:
-        """
-        Verifies that a given turn is still available, taking into account other completed reservations
-        :param available_schedules: The schedules and their status of a given date
-        :param new_turn: The turn information, such as the turn number
-        :return: True or False, depending on the turn status
-        """
-        for schedule in available_schedules:
-            if schedule.get('schedule') == new_turn.get('schedule'):
-                for turn in schedule.get('turns'):
-                    if turn.get('turn') == int(new_turn.get('turn_number')):
-                        return turn.get('status')
-        return False
-
     @staticmethod
     def check_positions_availability(turn_positions, user_positions) -> bool:
         """
@@ -147,10 +130,16 @@ class Turn(BaseModel):
         for turn in reservation.turns:
             if turn._id == updated_turn.get('_id'):
                 allocation_date = updated_turn.get('date')
-                viable_update = cls.verify_update(reservation, updated_turn, turn)
-                if viable_update:
+                former_pilots = cls.verify_update(reservation, updated_turn, turn)
+                try:
                     DateModel.update_temp(allocation_date, updated_turn, reservation.type, is_user)
-                    return cls.update(reservation, updated_turn, updated_turn.get('_id'), is_user)
+                except ScheduleNotAvailable:
+                    # Another reservation claimed the positions after they were verified
+                    first_date = MEXICO_TZ.localize(datetime.datetime.strptime(allocation_date, "%Y-%m-%d"))
+                    query = {'date': {'$gte': first_date, '$lte': first_date}}
+                    cls.rollback_update(reservation, query, turn, former_pilots)
+                    raise
+                return cls.update(reservation, updated_turn, updated_turn.get('_id'), is_user)
         raise TurnNotFound("El turno con el ID dado no existe")
 
     @classmethod
@@ -185,9 +174,9 @@ class Turn(BaseModel):
         """
         date = MEXICO_TZ.localize(datetime.datetime.strptime(date, "%Y-%m-%d"))
         query = {'date': date}
-        result: dict = Database.find_one(COLLECTION, query)
+        result: dict = DateStorage.find_one(query, fields=['type'])
         if result:
-            date = DateModel(**result)
+            date = DateView(result)
             blocked_turns = {"schedules": list(),
                              "turns": list()}
             for schedule in date.schedules:
@@ -209,7 +198,7 @@ class Turn(BaseModel):
         :param reservation: Reservation object
         :param updated_turn: The new turn information
         :param former_turn: Previous turn object
-        :return: True if the update was successful; error message otherwise
+        :return: The pilots removed from the former turn if the update is doable; error message otherwise
         """
         first_date = MEXICO_TZ.localize(datetime.datetime.strptime(updated_turn.get('date'), "%Y-%m-%d"))
         last_date = first_date
@@ -228,7 +217,7 @@ class Turn(BaseModel):
                 # Verifies that the positions selected are still available
                 positions_available = cls.check_positions_availability(turn_positions, user_positions)
                 if positions_available:
-                    return True
+                    return pilots
                 else:
                     cls.rollback_update(reservation, query, former_turn, pilots)
                     raise ScheduleNotAvailable("Las posiciones que seleccionaste ya no se encuentran disponibles.")
@@ -248,20 +237,21 @@ class Turn(BaseModel):
         :param query: The query that pymongo will process
         :return: Pilots of a turn
         """
-        for date in Database.find(COLLECTION, query):
-            new_date = DateModel(**date)
-            for schedule in new_date.schedules:
-                if schedule.hour == former_turn.schedule:
-                    for turn in schedule.turns:
-                        if turn.turn_number == int(former_turn.turn_number):
-                            pilots = turn.pilots.copy()
-                            for pilot in pilots:
-                                if pilot._id in [pilot._id for pilot in reservation.pilots]:
-                                    turn.pilots.remove(pilot)
-                            if "BLOQUEADO" not in turn.type and (turn.pilots is None or turn.pilots == []):
-                                turn.type = None
-                            new_date.update_mongo(COLLECTION)
-                            return pilots
+        pilot_ids = [pilot._id for pilot in reservation.pilots]
+
+        def remove(turn: AbstractTurn):
+            pilots = turn.pilots.copy()
+            for pilot in pilots:
+                if pilot._id in pilot_ids:
+                    turn.pilots.remove(pilot)
+            if "BLOQUEADO" not in turn.type and (turn.pilots is None or turn.pilots == []):
+                turn.type = None
+            return pilots
+
+        day_id, pilots = DateStorage.update_turn(query, former_turn.schedule, int(former_turn.turn_number), remove)
+        if day_id is not None:
+            DateSummary.refresh_dates({'_id': day_id})
+        return pilots
 
     @classmethod
     def remove_allocation_dates(cls, reservation: Reservation, current_turn: 'Turn', remove_type: str) -> None:
@@ -276,22 +266,59 @@ class Turn(BaseModel):
         last_date = first_date + datetime.timedelta(days=1)
 
         query = {'date': {'$gte': first_date, '$lte': last_date}}
-        result = list(Database.find(COLLECTION, query))
-        new_date = DateModel(**result[0])
-        for schedule in filter(lambda schedule: schedule.hour == current_turn.schedule, new_date.schedules):
-            for turn in filter(lambda turn: turn.turn_number == int(current_turn.turn_number), schedule.turns):
-                pilots = turn.pilots.copy()
-                for pilot in filter(lambda pilot: pilot._id in [pilot._id for pilot in reservation.pilots],
-                                    pilots):
-                    if remove_type == "allocation_date":
-                        pilot.allocation_date = None
-                    elif remove_type == "pilot":
-                        for pos in [x for x in current_turn.positions]:
-                            if pilot.position == int(pos[-1]):
-                                turn.pilots.remove(pilot)
-                if "BLOQUEADO" not in turn.type and (turn.pilots is None or turn.pilots == []):
-                    turn.type = None
-        new_date.update_mongo(COLLECTION)
+        pilot_ids = [pilot._id for pilot in reservation.pilots]
+
+        def remove(turn: AbstractTurn):
+            pilots = turn.pilots.copy()
+            for pilot in filter(lambda pilot: pilot._id in pilot_ids, pilots):
+                if remove_type == "allocation_date":
+                    pilot.allocation_date = None
+                elif remove_type == "pilot":
+                    for pos in [x for x in current_turn.positions]:
+                        if pilot.position == int(pos[-1]):
+                            turn.pilots.remove(pilot)
+            if "BLOQUEADO" not in turn.type and (turn.pilots is None or turn.pilots == []):
+                turn.type = None
+
+        day_id, _ = DateStorage.update_turn(query, current_turn.schedule, int(current_turn.turn_number), remove)
+        if day_id is not None:
+            DateSummary.refresh_dates({'_id': day_id})
+
+    @staticmethod
+    def reservation_days(reservation: Reservation) -> dict:
+        """
+        Builds the query of the days where the turns of the reservation are looked up
+        :param reservation: Reservation object
+        :return: The query over the date of the days
+        """
+        first_date = datetime.datetime.strptime(datetime.datetime.strftime(reservation.date, "%Y-%m-%d"), "%Y-%m-%d")
+        return {'date': {'$gte': first_date, '$lte': first_date + datetime.timedelta(days=1)}}
+
+    @classmethod
+    def confirm_allocation_dates(cls, reservation: Reservation) -> None:
+        """
+        Removes from the Dates collection the "allocation date" of the pilots in every turn of the reservation, once its
+        transaction was completed, with a single bulk write. The summaries of the days are left to
+        Turn.refresh_summaries
+        :param reservation: Reservation object
+        :return: None
+        """
+        pilot_ids = [pilot._id for pilot in reservation.pilots]
+        turns = [(turn.schedule, int(turn.turn_number), pilot_ids,
+                  AbstractTurn.positions_mask(position[-1] for position in turn.positions))
+                 for turn in reservation.turns]
+        DateStorage.confirm_seats(cls.reservation_days(reservation), turns)
+
+    @classmethod
+    def refresh_summaries(cls, reservation: Reservation) -> dict:
+        """
+        Rewrites the summaries of the days of the reservation. It must run after the transaction of the payment is
+        committed: a summary already written from a newer state of its day is reported as a failed upsert, and any
+        failed write aborts the transaction it is part of
+        :param reservation: Reservation object
+        :return: JSON object with the counts of the bulk write
+        """
+        return DateSummary.refresh_dates(cls.reservation_days(reservation))
 
     @classmethod
     def update(cls, reservation: Reservation, updated_turn, turn_id, is_user: bool) -> 'Turn':
@@ -320,27 +347,64 @@ class Turn(BaseModel):
 
     @staticmethod
     def rollback_update(reservation: Reservation, query, former_turn, pilots):
-        for date in Database.find(COLLECTION, query):
-            new_date = DateModel(**date)
-            for schedule in new_date.schedules:
-                if schedule.hour == former_turn.schedule:
-                    for turn in schedule.turns:
-                        if turn.turn_number == int(former_turn.turn_number):
-                            for pilot in pilots:
-                                turn.pilots.append(pilot)
-                            if turn.type is None or turn.pilots is None or turn.pilots == []:
-                                if "BLOQUEADO" not in turn.type:
-                                    turn.type = reservation.type
-                            new_date.update_mongo(COLLECTION)
+        def restore(turn: AbstractTurn):
+            for pilot in pilots or []:
+                turn.pilots.append(pilot)
+            if turn.type is None or ((turn.pilots is None or turn.pilots == []) and "BLOQUEADO" not in turn.type):
+                turn.type = reservation.type
+
+        day_id, _ = DateStorage.update_turn(query, former_turn.schedule, int(former_turn.turn_number), restore)
+        if day_id is not None:
+            DateSummary.refresh_dates({'_id': day_id})
 
 
 class AbstractTurn(BaseModel):
-    def __init__(self, turn_number, type=None, pilots=None, _id=None):
+    __slots__ = ('_id', 'turn_number', 'type', 'pilots', 'occupied', 'held', 'version')
+
+    def __init__(self, turn_number, type=None, pilots=None, occupied=0, held=0, version=0, _id=None):
         from app.models.pilots.pilot import AbstractPilot
         super().__init__(_id)
         self.turn_number = turn_number
         self.type = type
         self.pilots = [AbstractPilot(**pilot) for pilot in pilots] if pilots is not None else list()
+        # Bit k - 1 of each mask stands for the position k; held positions are still waiting for their payment
+        self.occupied = occupied
+        self.held = held
+        # Incremented on every write of the turn, so a read-modify-write can tell if someone else wrote it meanwhile
+        self.version = version
+        self.refresh_masks()
+
+    def json(self, exclude=None, date_to_string=True):
+        self.refresh_masks()
+        return super().json(exclude, date_to_string)
+
+    @staticmethod
+    def positions_mask(positions) -> int:
+        """
+        Builds the bitmask of the given positions
+        :param positions: 1 - 8 positions in a turn
+        :return: Integer with the bit k - 1 set for every position k
+        """
+        mask = 0
+        for position in positions:
+            mask |= 1 << (int(position) - 1)
+        return mask
+
+    def refresh_masks(self) -> None:
+        """
+        Rebuilds the occupied and held masks from the pilots of the turn, so they are saved along with them
+        :return: None
+        """
+        self.occupied = self.positions_mask(pilot.position for pilot in self.pilots)
+        self.held = self.positions_mask(pilot.position for pilot in self.pilots if pilot.allocation_date is not None)
+
+    def is_free(self, position) -> bool:
+        """
+        Verifies if a position of the turn is not taken by any pilot
+        :param position: 1 - 8 positions in the turn
+        :return: True or False, depending the position availability
+        """
+        return not self.occupied & (1 << (int(position) - 1))
 
     @classmethod
     def add(cls, schedule: Schedule, new_turn):
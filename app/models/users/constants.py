@@ -1 +1,7 @@
-COLLECTION = 'users'
\ No newline at end of file
+from pymongo import ASCENDING, IndexModel
+
+COLLECTION = 'users'
+
+INDEXES = {
+    COLLECTION: [IndexModel([('email', ASCENDING)], unique=True)]
+}
@@ -2079,3 +2079,119 @@ class AlterAdmin(Resource):
             return Response(message=e.message).json(), 401
         except Exception as e:
             return Response.generic_response(e), 500
+
+
+class Metrics(Resource):
+    @staticmethod
+    @Utils.admin_login_required
+    def get():
+        """
+        Retrieves the performance counters of the worker that handles the request
+
+        .. :quickref: Métricas; Contadores de rendimiento del servidor
+
+        **Example request**:
+
+        .. sourcecode:: http
+
+            GET /admin/metrics HTTP/1.1
+            Host: gokartmania.com.mx
+            Accept: application/json
+
+        **Example response**:
+
+        .. sourcecode:: http
+
+            HTTP/1.1 200 OK
+            Vary: Accept
+            Content-Type: application/json
+
+            {
+                "cache": {
+                    "available_dates_user": {
+                        "hits": 42,
+                        "misses": 8,
+                        "hit_ratio": 0.84
+                    }
+                },
+                "database": {
+                    "open": 3,
+                    "in_use": 1,
+                    "created": 3,
+                    "closed": 0,
+                    "checked_out": 512,
+                    "check_out_failed": 0,
+                    "pool_cleared": 0,
+                    "max_pool_size": 50,
+                    "min_pool_size": 1
+                },
+                "queries": {
+                    "slow_ms": 100.0,
+                    "window": 1000,
+                    "operations": {
+                        "date_availability.find": {
+                            "count": 50,
+                            "p50": 0.812,
+                            "p95": 2.104,
+                            "p99": 3.877,
+                            "max": 4.02,
+                            "histogram": {"<1": 31, "<5": 19, "<10": 0, "<25": 0, "<50": 0, "<100": 0,
+                                          "<250": 0, "<500": 0, "<1000": 0, ">=1000": 0},
+                            "documents": 1550,
+                            "failures": 0
+                        }
+                    },
+                    "endpoints": {
+                        "availabledatesuser": {
+                            "queries": 50,
+                            "ms": 56.3
+                        }
+                    },
+                    "profiles": {
+                        "primary": {
+                            "queries": 50,
+                            "ms": 56.3,
+                            "servers": {"10.0.0.1:27017": 50}
+                        }
+                    },
+                    "read_profiles": {
+                        "primary": {"mode": "primary"},
+                        "analytics": {"mode": "secondaryPreferred", "maxStalenessSeconds": 120}
+                    }
+                },
+                "concurrency": {
+                    "writes": 120,
+                    "conflicts": 4,
+                    "retries": 4,
+                    "exhausted": 0,
+                    "hotspots": {
+                        "sábado 17:00": 3,
+                        "domingo 12:00": 1
+                    }
+                }
+            }
+
+        **Example response error**:
+
+        .. sourcecode:: http
+
+            HTTP/1.1 401 Unauthorised
+            Vary: Accept
+            Content-Type: application/json
+
+            {
+                "success": false,
+                "message": "Uso de variable de sesión no autorizada."
+            }
+
+        :resheader Content-Type: application/json
+        :status 200: metrics retrieved
+        :status 401: malformed
+        :status 500: internal error
+
+        :return: JSON object with the counters
+        """
+        try:
+            return AdminModel.get_metrics(), 200
+        except Exception as e:
+            return Response.generic_response(e), 500
@@ -1,14 +1,13 @@
 from flask_restful import Resource
-from flask import session
+from flask import session, request, stream_with_context, Response as RESPONSE
 
 from app import Response
 from app.common.utils import Utils
-from app.models.dates.constants import PARSER
+from app.models.dates.constants import PARSER, COMPACT_MIMETYPE
 from app.models.dates.date import Date as DateModel
 from app.models.reservations.constants import COLLECTION_TEMP
 from app.models.reservations.errors import ReservationErrors
 from app.models.reservations.reservation import Reservation as ReservationModel
-import calendar
 
 
 class Dates(Resource):
@@ -1103,7 +1102,8 @@ class Dates(Resource):
         :return: Array of :class:`app.models.dates.date.Date`
         """
         try:
-            return [date.json() for date in DateModel.get_dates_in_range(start_date, end_date)], 200
+            dates = DateModel.iter_json_in_range(start_date, end_date)
+            return RESPONSE(stream_with_context(DateModel.stream_json(dates)), content_type='application/json')
         except ReservationErrors as e:
             return Response(message=e.message).json(), 401
         except Exception as e:
@@ -1166,9 +1166,10 @@ class Dates(Resource):
         """
         try:
             data = PARSER.parse_args()
-            month_dates = calendar.monthrange(data.get('year'), data.get('month'))[1]
-            for i in range(month_dates):
-                DateModel.add(data, i+1)
+            result = DateModel.add_month(data)
+            if result.get('errors'):
+                return Response(message=f"Se registraron {result.get('inserted')} días, "
+                                        f"{len(result.get('errors'))} ya estaban registrados").json(), 401
             return Response(success=True, message="Registro del mes exitoso").json(), 200
         except ReservationErrors as e:
             return Response(message=e.message).json(), 401
@@ -1442,6 +1443,8 @@ class AvailableSchedulesUser(Resource):
         Retrieves the schedules with their status of availability in a given date
 
         :param date: The date to be processed
+        :query format: compact to receive the turns and positions of each schedule as arrays (also selected with
+                       the header Accept: application/vnd.gokartmania.compact+json)
 
         .. :quickref: Horarios-Admin; Status de ocupación de los horarios en un día
 
@@ -2640,6 +2643,31 @@ class AvailableSchedulesUser(Resource):
                     }
                 ]
 
+        **Example compact response**:
+
+        Turns hold their status in order, and each string holds the status of the positions of a turn (1 - free).
+
+        .. sourcecode:: http
+
+            HTTP/1.1 200 OK
+            Vary: Accept
+            Content-Type: application/json
+
+            {
+                "layout": {
+                    "turns": 5,
+                    "positions": 8
+                },
+                "schedules": [
+                    {
+                        "schedule": "16",
+                        "cupo": 1,
+                        "turns": [2, 1, 0, 2, 2],
+                        "positions": ["11111111", "00111111", "11110111", "11111111", "11111111"]
+                    }
+                ]
+            }
+
         **Example response error**:
 
         .. sourcecode:: http
@@ -2662,7 +2690,9 @@ class AvailableSchedulesUser(Resource):
         """
         try:
             reservation = ReservationModel.get_by_id(session['reservation'], COLLECTION_TEMP)
-            return DateModel.get_available_schedules_user(reservation, date), 200
+            compact = request.args.get('format') == 'compact' or \
+                COMPACT_MIMETYPE in request.headers.get('Accept', '')
+            return DateModel.get_available_schedules_user(reservation, date, compact), 200
         except ReservationErrors as e:
             return Response(message=e.message).json(), 401
         except Exception as e:
@@ -497,8 +497,7 @@ class RetrieveReservation(Resource):
         :return: JSON object with the reservation
         """
         try:
-            reservation = ReservationModel.get_by_id(reservation_id, REAL_RESERVATIONS)
-            return reservation.json(), 200
+            return ReservationModel.get_json(reservation_id, REAL_RESERVATIONS), 200
         except ReservationErrors as e:
             return Response(message=e.message).json(), 401
         except Exception as e:
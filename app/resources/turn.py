@@ -375,6 +375,8 @@ class UserChangeTurn(Resource):
             return Response(message=e.message).json(), 409
         except ScheduleErrors as e:
             return Response(message=e.message).json(), 409
+        except DateErrors as e:
+            return Response(message=e.message).json(), 409
         except UserErrors as e:
             return Response(message=e.message).json(), 401
         except ReservationErrors as e:
@@ -449,6 +451,8 @@ class UserChangeTurn(Resource):
             return Response(message=e.message).json(), 409
         except ScheduleErrors as e:
             return Response(message=e.message).json(), 409
+        except DateErrors as e:
+            return Response(message=e.message).json(), 409
         except UserErrors as e:
             return Response(message=e.message).json(), 401
         except ReservationErrors as e:
@@ -0,0 +1,10 @@
+from app.models.dates.date import Date
+from app.common.database import Database
+
+Database.initialize()
+
+try:
+    Date.refresh_masks({})
+    print("Mascaras de ocupacion de los turnos reconstruidas con exito")
+except Exception as e:
+    print(e.__repr__())
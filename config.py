@@ -31,6 +31,41 @@ class Config:
                           'text/javascript',
                           'text/javascript; charset=utf-8'
                           ]
+    # Connection pool of the MongoClient of each worker
+    MONGODB_OPTIONS = {
+        'maxPoolSize': int(os.environ.get('MONGODB_MAX_POOL_SIZE') or 50),
+        'minPoolSize': int(os.environ.get('MONGODB_MIN_POOL_SIZE') or 1),
+        'maxIdleTimeMS': int(os.environ.get('MONGODB_MAX_IDLE_TIME_MS') or 300000),
+        'connectTimeoutMS': int(os.environ.get('MONGODB_CONNECT_TIMEOUT_MS') or 5000),
+        'socketTimeoutMS': int(os.environ.get('MONGODB_SOCKET_TIMEOUT_MS') or 30000),
+        'serverSelectionTimeoutMS': int(os.environ.get('MONGODB_SERVER_SELECTION_TIMEOUT_MS') or 5000),
+        'waitQueueTimeoutMS': int(os.environ.get('MONGODB_WAIT_QUEUE_TIMEOUT_MS') or 5000)
+    }
+    # Layout of the days: 'embedded' (a document per day) or 'turns' (a document per turn, in the date_turns
+    # collection); app/dates_layout_migration.py moves the existing days from one to the other
+    DATES_LAYOUT = os.environ.get('DATES_LAYOUT') or 'embedded'
+    # Instrumentation of the MongoDB operations: commands slower than slow_ms are logged, and explained if explain is
+    # set; the histograms keep the latest `window` latencies of each collection and operation
+    QUERY_STATS = {
+        'slow_ms': float(os.environ.get('SLOW_QUERY_MS') or 100),
+        'explain': os.environ.get('SLOW_QUERY_EXPLAIN') == 'True',
+        'window': int(os.environ.get('QUERY_STATS_WINDOW') or 1000)
+    }
+    # Read profiles of the queries: the analytics and reports of the admins may be served by the secondaries of a
+    # replica set, with data at most max_staleness seconds old (90 at least, or -1 for no limit); bookings always read
+    # the primary
+    READ_PROFILES = {
+        'analytics': {'mode': os.environ.get('ANALYTICS_READ_MODE') or 'secondaryPreferred',
+                      'max_staleness': int(os.environ.get('ANALYTICS_MAX_STALENESS') or 120)}
+    }
+    # Seconds during which each worker serves the locations and their prices without reading them again
+    LOCATIONS_TTL = float(os.environ.get('LOCATIONS_TTL') or 600)
+    # Encoder of the JSON responses: 'orjson', 'json' for the stdlib one, or unset for orjson whenever it is installed
+    JSON_ENCODER = os.environ.get('JSON_ENCODER')
+    # Cache of the availability responses: 'memory' (one per worker), 'sqlite' (shared by the workers) or None
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or 'memory'
+    CACHE_SIZE = int(os.environ.get('CACHE_SIZE') or 512)
+    CACHE_PATH = os.environ.get('CACHE_PATH') or os.path.join(basedir, 'availability-cache.sqlite')
 
 
 class DevelopmentConfig(Config):
@@ -40,6 +75,7 @@ class DevelopmentConfig(Config):
 
 class TestingConfig(Config):
     TESTING = True
+    CACHE_BACKEND = None
 
 
 config = {
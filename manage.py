@@ -1,6 +1,443 @@
 import os
+import sys
+import timeit
+
 from app import create_app
+from app.common.database import Database
+from app.common.indexes import Indexes
+
 app = create_app(os.getenv('FLASK_CONFIG') or 'default')
 
+
+@app.cli.command('ensure-indexes', with_appcontext=False)
+def ensure_indexes():
+    """
+    Creates the indexes declared by the models that are missing, and reports the ones that are not declared
+    """
+    Database.initialize(app.config.get('MONGODB_OPTIONS'))
+    for collection, report in Indexes.ensure().items():
+        for name in report.get('created'):
+            print(f"{collection}: índice {name} creado")
+        for failed in report.get('failed'):
+            print(f"{collection}: no se pudo crear el índice {failed.get('name')}: {failed.get('error')}")
+        for name in report.get('different'):
+            print(f"{collection}: el índice {name} existe con otras opciones, "
+                  f"bórralo para crearlo como está declarado")
+        for name in report.get('extra'):
+            print(f"{collection}: el índice {name} no está declarado en los modelos")
+
+
+@app.cli.command('backfill-masks', with_appcontext=False)
+def backfill_masks():
+    """
+    Builds the occupied and held masks of the turns saved before the masks existed, whose seats can't be claimed until
+    then; it runs once after upgrading, and again only if old days are restored
+    """
+    from app.models.dates.storage import DateStorage
+
+    Database.initialize(app.config.get('MONGODB_OPTIONS'))
+    DateStorage.initialize(app.config.get('DATES_LAYOUT'))
+    report = DateStorage.backfill_masks()
+    print(f"{report.get('modified')} turnos con sus máscaras reconstruidas, {len(report.get('errors'))} errores")
+
+
+@app.cli.command('explain-queries', with_appcontext=False)
+def explain_queries():
+    """
+    Explains the frequent lookups of the application, and fails if any of them is not served by an index
+    """
+    Database.initialize(app.config.get('MONGODB_OPTIONS'))
+    explained_queries = Indexes.explain()
+    for explained in explained_queries:
+        status = 'COLLSCAN' if explained.get('collscan') else 'ok'
+        print(f"{status}: {explained.get('collection')} {explained.get('query')} -> "
+              f"{' > '.join(explained.get('stages'))}")
+    if any(explained.get('collscan') for explained in explained_queries):
+        sys.exit(1)
+
+
+@app.cli.command('check-transactions', with_appcontext=False)
+def check_transactions():
+    """
+    Verifies, with throwaway documents, that the writes of a paid reservation are discarded when one of them fails,
+    and committed once when the transaction is retried after a transient error, and fails otherwise. It needs a replica
+    set
+    """
+    import uuid
+    from pymongo.errors import PyMongoError
+    from app.models.promos.constants import COLLECTION as PROMOS
+    from app.models.reservations.constants import COLLECTION as RESERVATIONS, COLLECTION_TEMP
+
+    Database.initialize(app.config.get('MONGODB_OPTIONS'))
+    if not Database.supports_transactions():
+        print("El servidor no es un replica set: las escrituras del pago no son atómicas y no hay nada que verificar")
+        return
+    reservation_id, promo_id = f'check-{uuid.uuid4().hex}', f'check-{uuid.uuid4().hex}'
+    Database.insert(COLLECTION_TEMP, {'_id': reservation_id})
+    attempts = []
+
+    def failed_payment():
+        # Same order as Payment.commit_reservation_payment: the promo, the reservation, and then the seats
+        Database.update(PROMOS, {'_id': promo_id}, {'_id': promo_id, 'coupons': []})
+        Database.update(RESERVATIONS, {'_id': reservation_id}, {'_id': reservation_id})
+        Database.remove(COLLECTION_TEMP, {'_id': reservation_id})
+        raise PyMongoError("Escritura de los asientos fallida a propósito")
+
+    def retried_payment():
+        attempts.append(1)
+        Database.update(RESERVATIONS, {'_id': reservation_id}, {'_id': reservation_id})
+        Database.remove(COLLECTION_TEMP, {'_id': reservation_id})
+        if len(attempts) == 1:
+            raise PyMongoError("Conflicto transitorio provocado a propósito",
+                               error_labels=['TransientTransactionError'])
+
+    try:
+        try:
+            Database.run_in_transaction(failed_payment)
+        except PyMongoError as e:
+            print(f"Pago abortado: {e}")
+        rolled_back = (Database.find_one(PROMOS, {'_id': promo_id}) is None and
+                       Database.find_one(RESERVATIONS, {'_id': reservation_id}) is None and
+                       Database.find_one(COLLECTION_TEMP, {'_id': reservation_id}) is not None)
+        print(f"Abortar: "
+              f"{'ok, ninguna escritura se guardó' if rolled_back else 'FALLA, quedaron escrituras parciales'}")
+        Database.run_in_transaction(retried_payment)
+        committed = (Database.DATABASE[RESERVATIONS].count_documents({'_id': reservation_id}) == 1 and
+                     Database.find_one(COLLECTION_TEMP, {'_id': reservation_id}) is None)
+        print(f"Reintentar: {'ok' if committed and len(attempts) == 2 else 'FALLA'}, "
+              f"{len(attempts)} intentos y la reservación guardada una vez")
+    finally:
+        Database.remove(PROMOS, {'_id': promo_id})
+        Database.remove(RESERVATIONS, {'_id': reservation_id})
+        Database.remove(COLLECTION_TEMP, {'_id': reservation_id})
+    if not rolled_back or not committed or len(attempts) != 2:
+        sys.exit(1)
+
+
+def booked_month() -> list:
+    """
+    Builds in memory a fully booked month of dates, every turn with all of its positions taken
+    :return: List of Date objects
+    """
+    import calendar
+    import datetime
+    from app.models.dates.constants import MEXICO_TZ, POSITIONS
+    from app.models.dates.date import Date
+    from app.models.pilots.pilot import AbstractPilot
+
+    now = MEXICO_TZ.localize(datetime.datetime.now())
+    days = calendar.monthrange(now.year, now.month)[1]
+    month = [Date.build({'year': now.year, 'month': now.month}, day) for day in range(1, days + 1)]
+    for date in month:
+        for schedule in date.schedules:
+            for turn in schedule.turns:
+                turn.type = 'Adultos'
+                turn.pilots = [AbstractPilot(position, now if position % 2 else None)
+                               for position in range(1, POSITIONS + 1)]
+    return month
+
+
+def mixed_month() -> list:
+    """
+    Builds in memory a month of dates with every kind of turn: empty, partially and fully booked, for Adults and Kids,
+    and blocked
+    :return: List of Date objects
+    """
+    import random
+    from app.models.pilots.pilot import AbstractPilot
+
+    generator = random.Random(1)
+    month = booked_month()
+    for date in month:
+        for schedule in date.schedules:
+            for turn in schedule.turns:
+                turn.type = generator.choice([None, None, 'Adultos', 'Adultos', 'Niños', 'Adultos-BLOQUEADO',
+                                              'BLOQUEADO'])
+                pilots = 0 if turn.type in (None, 'BLOQUEADO') else generator.randint(1, len(turn.pilots))
+                turn.pilots = [AbstractPilot(position, None) for position in generator.sample(range(1, 9), pilots)]
+    return month
+
+
+def dict_availability(documents, reservation_type, total_pilots) -> dict:
+    """
+    Builds the availability dictionary with the nested loops that the NumPy engine replaced, as the reference of
+    benchmark-availability
+    :param documents: List of raw date documents
+    :param reservation_type: The type of reservation (Kids or Adults)
+    :param total_pilots: The size of the party of the reservation
+    :return: JSON object with dates, schedules, turns, and positions, with their status
+    """
+    from app.models.dates.date import Date
+
+    month = [Date(**document) for document in documents]
+    turn_types = [turn.type for date in month for schedule in date.schedules for turn in schedule.turns]
+    availability_dict = {}
+    i = 0
+    for date in month:
+        date_str = date.date.strftime("%Y-%m-%d")
+        availability_dict[date_str] = {}
+        busy_schedules = 0
+        empty_schedules = 0
+        for schedule in date.schedules:
+            availability_dict[date_str][schedule.hour] = {}
+            busy_turns = 0
+            for turn in schedule.turns:
+                availability = availability_dict[date_str][schedule.hour][turn.turn_number] = {}
+                for k in range(1, 9):
+                    availability[f'pos{k}'] = 0 if k in [pilot.position for pilot in turn.pilots] else 1
+                if turn.type is None:
+                    if "Niños" in turn_types[max(i - 2, 0): i] + turn_types[i + 1: i + 3]:
+                        availability['cupo'] = 0
+                        busy_turns += 1
+                    else:
+                        availability['cupo'] = 2
+                elif "BLOQUEADO" in turn.type:
+                    availability['cupo'] = 0
+                    busy_turns += 1
+                elif turn.type != reservation_type or total_pilots + len(turn.pilots) > 8:
+                    availability['cupo'] = 0
+                    busy_turns += 1
+                else:
+                    availability['cupo'] = 1
+                    busy_turns += 1
+                i += 1
+            if busy_turns == 5:
+                availability_dict[date_str][schedule.hour]["cupo"] = 0
+                busy_schedules += 1
+            elif busy_turns == 0:
+                availability_dict[date_str][schedule.hour]["cupo"] = 2
+                empty_schedules += 1
+            else:
+                availability_dict[date_str][schedule.hour]["cupo"] = 1
+        if busy_schedules == 11:
+            availability_dict[date_str]["cupo"] = 0
+        elif empty_schedules == 11:
+            availability_dict[date_str]["cupo"] = 2
+        else:
+            availability_dict[date_str]["cupo"] = 1
+    return availability_dict
+
+
+@app.cli.command('benchmark-availability', with_appcontext=False)
+def benchmark_availability():
+    """
+    Times the availability of a month, built in memory, with the NumPy engine against the nested loops it replaced,
+    and verifies that both give the same statuses
+    """
+    from app.models.dates.availability import AvailabilityMatrix
+
+    month = mixed_month()
+    documents = [date.json(date_to_string=False) for date in month]
+    for reservation_type, total_pilots in (('Adultos', 2), ('Niños', 6)):
+        engine = AvailabilityMatrix.from_documents(documents).to_dict(reservation_type, total_pilots)
+        reference = dict_availability(documents, reservation_type, total_pilots)
+        numpy_seconds = min(timeit.repeat(lambda: AvailabilityMatrix.from_documents(documents).to_dict(
+            reservation_type, total_pilots), number=10, repeat=5)) / 10
+        dict_seconds = min(timeit.repeat(lambda: dict_availability(documents, reservation_type, total_pilots),
+                                         number=10, repeat=5)) / 10
+        print(f"{reservation_type}, {total_pilots} pilotos: NumPy {numpy_seconds * 1000:.1f} ms, "
+              f"diccionarios {dict_seconds * 1000:.1f} ms por mes, "
+              f"{'mismos' if engine == reference else 'distintos'} estados")
+
+
+def index_blocking(reservation, availability_arr: list) -> list:
+    """
+    Blocks the current, previous, and next turns for each turn in the reservation by searching the schedule-turn
+    product, as the index map replaced, as the reference of benchmark-blocking
+    :param reservation: Reservation object, or any object with its turns
+    :param availability_arr: Array containing status and positions for each available schedule and turn
+    :return: List object of availability array, updated with blocked turns
+    """
+    import itertools
+
+    schedule_turns = [(turn.schedule, turn.turn_number) for turn in reservation.turns]
+    schedules = [x.get('schedule') for x in availability_arr]
+    turns = [str(x.get('turn')) for x in availability_arr[0].get('turns')]
+    product = list(itertools.product(schedules, turns))
+    result = [(product.index(x) - 1, product.index(x) + 1) for x in schedule_turns if x in product]
+    for x in result:
+        turns_to_block = product[0 if x[0] < 0 else x[0]: None if x[1] + 1 > len(product) else x[1] + 1]
+        for schedule_turn in turns_to_block:
+            for item in availability_arr:
+                if item.get('schedule') == schedule_turn[0]:
+                    item.get('turns')[int(schedule_turn[1]) - 1].update({'status': 0})
+                    item.update({'cupo': 1})
+    return availability_arr
+
+
+@app.cli.command('benchmark-blocking', with_appcontext=False)
+def benchmark_blocking():
+    """
+    Times the blocking of the turns around a reservation of several races on a whole day, through the index map
+    against the search it replaced, and verifies that both block the same turns
+    """
+    import random
+    import types
+    from app.models.dates.constants import FIRST_SCHEDULE, SCHEDULES, TURNS, POSITIONS
+    from app.models.dates.date import Date
+
+    def availability_arr():
+        return [{'schedule': f'{FIRST_SCHEDULE + s}', 'cupo': 2,
+                 'turns': [{'turn': t + 1, 'status': 2,
+                            'positions': [{'position': str(k), 'status': 1} for k in range(1, POSITIONS + 1)]}
+                           for t in range(TURNS)]}
+                for s in range(SCHEDULES)]
+
+    generator = random.Random(1)
+    for races in (1, 10, 30):
+        day = [(f'{FIRST_SCHEDULE + s}', f'{t + 1}') for s in range(SCHEDULES) for t in range(TURNS)]
+        turns = generator.sample(day, races)
+        reservation = types.SimpleNamespace(turns=[types.SimpleNamespace(schedule=schedule, turn_number=turn_number)
+                                                   for schedule, turn_number in turns])
+        mapped, searched = availability_arr(), availability_arr()
+        # Blocking the same turns again does the same work, so every repetition reuses the same array
+        map_seconds = min(timeit.repeat(lambda: Date.block_turns_for_user(reservation, mapped),
+                                        number=1000, repeat=5)) / 1000
+        search_seconds = min(timeit.repeat(lambda: index_blocking(reservation, searched),
+                                           number=1000, repeat=5)) / 1000
+        print(f"{races} carreras: mapa de índices {map_seconds * 1e6:.1f} us, "
+              f"búsqueda {search_seconds * 1e6:.1f} us, "
+              f"{'mismos' if mapped == searched else 'distintos'} turnos bloqueados")
+
+
+def reference_json(self, exclude=None, date_to_string=True) -> dict:
+    """
+    Serializes a model as BaseModel.json did before its single pass, with a conditional expression per attribute, to be
+    timed and compared against it. The models nested in the days declare __slots__ now, so their attributes are read
+    from their FIELDS
+    :param self: The model
+    :param exclude: The attributes to be left out
+    :param date_to_string: Whether the datetimes are formatted as strings, or kept for MongoDB
+    :return: JSON object of the attributes
+    """
+    import datetime
+    from app.models.locations.location import Location
+    from app.models.payments.payment import Payment
+    from app.models.promos.promotion import Promotion
+
+    return {
+        attrib: [element.json(date_to_string=date_to_string) if not isinstance(element, str) else element
+                 for element in self.__getattribute__(attrib)]
+        if type(self.__getattribute__(attrib)) is list
+        else self.__getattribute__(attrib).json()
+        if not exclude and isinstance(self.__getattribute__(attrib), Location)
+        else self.__getattribute__(attrib).json()
+        if not exclude and isinstance(self.__getattribute__(attrib), Payment)
+        else self.__getattribute__(attrib).json()
+        if not exclude and isinstance(self.__getattribute__(attrib), Promotion)
+        else self.__getattribute__(attrib).strftime("%Y-%m-%d %H:%M")
+        if date_to_string and type(self.__getattribute__(attrib)) is datetime.datetime
+        else self.__getattribute__(attrib)
+        for attrib in (self.__dict__.keys() if self.FIELDS is None else self.FIELDS)
+        if not exclude or attrib not in exclude}
+
+
+@app.cli.command('benchmark-json', with_appcontext=False)
+def benchmark_json():
+    """
+    Times the serialization of a fully booked month of dates, built in memory, as it is sent to MongoDB and as it is
+    sent to the clients, against the former serializer and the stdlib encoding of flask_restful, and fails if they
+    don't produce the same output
+    """
+    import json
+    from app.common.representation import Representation
+    from app.models.baseModel import BaseModel
+
+    def timed(serialize):
+        return min(timeit.repeat(serialize, number=10, repeat=5)) / 10
+
+    month = booked_month()
+    single_pass = BaseModel.json
+    results = list()
+    for date_to_string in (False, True):
+        documents = [date.json(date_to_string=date_to_string) for date in month]
+        seconds = timed(lambda: [date.json(date_to_string=date_to_string) for date in month])
+        BaseModel.json = reference_json
+        try:
+            reference = [date.json(date_to_string=date_to_string) for date in month]
+            reference_seconds = timed(lambda: [date.json(date_to_string=date_to_string) for date in month])
+        finally:
+            BaseModel.json = single_pass
+        results.append(documents == reference)
+        print(f"date_to_string={date_to_string}: {seconds * 1000:.1f} ms por mes, "
+              f"{seconds * 1000 / len(month):.2f} ms por día; antes {reference_seconds * 1000:.1f} ms por mes; "
+              f"{'misma salida' if results[-1] else 'SALIDA DISTINTA'}")
+    # The response of /dates: the JSON of the models encoded by the API, and as flask_restful encoded them
+    seconds = timed(lambda: Representation.dumps([date.json() for date in month]))
+    BaseModel.json = reference_json
+    try:
+        reference = json.dumps([date.json() for date in month])
+        reference_seconds = timed(lambda: json.dumps([date.json() for date in month]))
+    finally:
+        BaseModel.json = single_pass
+    results.append(json.loads(Representation.dumps([date.json() for date in month])) == json.loads(reference))
+    print(f"respuesta de /dates con {Representation.ENCODER}: {seconds * 1000:.1f} ms por mes; antes, con "
+          f"flask_restful, {reference_seconds * 1000:.1f} ms por mes; "
+          f"{'misma salida' if results[-1] else 'SALIDA DISTINTA'}")
+    if not all(results):
+        sys.exit(1)
+
+
+@app.cli.command('benchmark-models', with_appcontext=False)
+def benchmark_models():
+    """
+    Measures the objects and memory taken by hydrating a fully booked month of dates from its MongoDB documents, as an
+    availability request of a month does
+    """
+    import resource
+    import tracemalloc
+    from app.models.dates.date import Date
+
+    documents = [date.json(date_to_string=False) for date in booked_month()]
+    tracemalloc.start()
+    month = [Date(**document) for document in documents]
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(statistic.count for statistic in snapshot.statistics('filename'))
+    models = len(month) + sum(len(date.schedules) + sum(len(schedule.turns) + sum(len(turn.pilots)
+                                                                                   for turn in schedule.turns)
+                                                            for schedule in date.schedules)
+                              for date in month)
+    print(f"{models} modelos, {blocks} bloques de memoria, {current / 1024:.0f} KiB retenidos, "
+          f"{peak / 1024:.0f} KiB pico, RSS máximo del proceso "
+          f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.1f} MiB")
+
+
+@app.cli.command('benchmark-representation', with_appcontext=False)
+def benchmark_representation():
+    """
+    Times the encoding of the largest responses, /dates, /admin/available_schedules and /promos, built in memory, with
+    every installed encoder
+    """
+    import datetime
+    from app.common.representation import Representation, ORJSON, STDLIB, orjson
+    from app.models.dates.constants import MEXICO_TZ, POSITIONS
+    from app.models.promos.promotion import Promotion
+
+    month = booked_month()
+    dates = [date.json() for date in month]
+    schedules = [{'schedules': [{'schedule': schedule.hour, 'status': 1,
+                                 'turns': [{'turn': turn.turn_number, 'type': turn.type, 'status': 1,
+                                            'positions': [{'position': position, 'status': int(turn.is_free(position))}
+                                                          for position in range(1, POSITIONS + 1)]}
+                                           for turn in schedule.turns]}
+                                for schedule in month[0].schedules]}]
+    now = MEXICO_TZ.localize(datetime.datetime.now())
+    promos = [Promotion(True, now, now, 1, True, 'Descuento', 10, coupons=[{'copies_left': 1, 'date_applied': now}
+                                                                            for _ in range(100)])
+              for _ in range(50)]
+    encoders = [STDLIB] + ([ORJSON] if orjson is not None else [])
+    for name, payload in (('/dates', dates), ('/admin/available_schedules', schedules), ('/promos', promos)):
+        for encoder in encoders:
+            Representation.initialize(encoder)
+            size = len(Representation.dumps(payload))
+            seconds = min(timeit.repeat(lambda: Representation.dumps(payload), number=10, repeat=5)) / 10
+            print(f"{name} con {encoder}: {seconds * 1000:.2f} ms, {size / 1024:.0f} KiB")
+
+
 if __name__ == '__main__':
-    app.run()
\ No newline at end of file
+    if len(sys.argv) > 1:
+        app.cli.main(args=sys.argv[1:], prog_name='manage.py')
+    else:
+        app.run()
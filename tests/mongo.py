@@ -0,0 +1,30 @@
+import unittest
+from unittest import mock
+
+from app.common.database import Database
+from app.models.locations.location import Location
+
+try:
+    import mongomock
+except ImportError:
+    # Without mongomock the tests that need a database are skipped
+    mongomock = None
+
+"""
+This is the base of the tests that read and write the collections, over an in-memory database.
+"""
+
+
+@unittest.skipIf(mongomock is None, "mongomock is not installed")
+class MongoTestCase(unittest.TestCase):
+    def setUp(self):
+        # mongomock can't read the dates in the Mexico City timezone, so they are read as they are saved
+        with_options = mock.patch.object(mongomock.collection.Collection, 'with_options',
+                                         lambda collection, **kwargs: collection)
+        with_options.start()
+        self.addCleanup(with_options.stop)
+        database = mock.patch.object(Database, 'DATABASE', mongomock.MongoClient(tz_aware=True)['GoKartMania'])
+        self.database = database.start()
+        self.addCleanup(database.stop)
+        Location.invalidate()
+        self.addCleanup(Location.invalidate)
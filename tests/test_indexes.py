@@ -0,0 +1,33 @@
+import unittest
+from unittest import mock
+
+from app.common.database import Database
+from app.common.indexes import Indexes, QUERIES
+
+
+class ExplainTest(unittest.TestCase):
+    def explain(self, plan):
+        database = mock.MagicMock()
+        database.__getitem__.return_value.find.return_value.explain.return_value = {'queryPlanner': {
+            'winningPlan': plan}}
+        with mock.patch.object(Database, 'DATABASE', database):
+            return Indexes.explain()
+
+    def test_index_scans_are_served(self):
+        report = self.explain({'stage': 'FETCH', 'inputStage': {'stage': 'OR', 'inputStages': [
+            {'stage': 'IXSCAN'}, {'stage': 'IXSCAN'}]}})
+        self.assertEqual(len(QUERIES), len(report))
+        self.assertFalse(any(explained.get('collscan') for explained in report))
+
+    def test_collection_scans_are_reported(self):
+        report = self.explain({'stage': 'SUBPLAN', 'inputStage': {'stage': 'OR', 'inputStages': [
+            {'stage': 'IXSCAN'}, {'stage': 'COLLSCAN'}]}})
+        self.assertTrue(all(explained.get('collscan') for explained in report))
+
+    def test_plans_without_an_index_are_reported(self):
+        report = self.explain({'stage': 'EOF'})
+        self.assertTrue(all(explained.get('collscan') for explained in report))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import datetime
+import os
+import unittest
+from unittest import mock
+
+import flask
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.common.database import Database
+from app.models.dates.constants import SUMMARY_COLLECTION
+from app.models.dates.date import Date
+from app.models.dates.storage import DateStorage
+from app.models.dates.summary import DateSummary
+from app.models.payments.payment import Payment
+from app.models.reservations.constants import COLLECTION, COLLECTION_TEMP
+from app.models.reservations.reservation import Reservation
+from app.models.users.user import User
+from tests.mongo import MongoTestCase
+
+
+class ReplicaSetSession(object):
+    """
+    Stands for the session of a replica set, which aborts the transaction once any of its writes fails. Mongomock
+    rejects every session, so this one is falsy to be let through
+    """
+    def __init__(self):
+        self.failed = False
+
+    def __bool__(self):
+        return False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def with_transaction(self, callback, **kwargs):
+        result = callback(self)
+        if self.failed:
+            raise OperationFailure("Transaction has been aborted.", 251)
+        return result
+
+
+class PaymentSummaryTest(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        Date.add({'year': 2026, 'month': 11}, 2)
+        transactions = mock.patch.multiple(Database, TRANSACTIONS=True, CLIENT=mock.Mock(**{
+            'start_session.side_effect': ReplicaSetSession}))
+        transactions.start()
+        self.addCleanup(transactions.stop)
+        bulk_write = Database.bulk_write
+
+        def failing_bulk_write(collection, requests, ordered=False):
+            report = bulk_write(collection, requests, ordered)
+            if report.get('errors') and Database.session() is not None:
+                Database.session().failed = True
+            return report
+
+        patches = [mock.patch.object(Database, 'bulk_write', failing_bulk_write),
+                   # Mongomock has no array filters, and the seats don't matter here
+                   mock.patch.object(DateStorage, 'confirm_seats', return_value={})]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.reservation = Reservation('Adultos', datetime.datetime(2026, 11, 2), pilots=[],
+                                       turns=[{'schedule': '12', 'turn_number': '1', 'positions': ['position1']}])
+        self.reservation.save_to_mongo(COLLECTION_TEMP)
+        self.user = User('piloto@gokartmania.com', 'Piloto')
+        app = flask.Flask(__name__)
+        app.secret_key = 'test'
+        self.context = app.test_request_context()
+        self.context.push()
+        self.addCleanup(self.context.pop)
+        flask.session['reservation_date'] = '2026-11-02'
+
+    def pay(self):
+        payment = Payment('PENDIENTE', 'Tarjeta', 'Credito')
+        return Payment.commit_reservation_payment(payment, 100, 0, self.reservation, None, None, self.user)
+
+    def test_stale_summary_does_not_abort_the_payment(self):
+        # Someone else wrote the summary from a newer state of the day meanwhile
+        self.database[SUMMARY_COLLECTION].update_many({}, {'$set': {'turns_version': 1000}})
+        self.assertEqual('APROBADO', self.pay().status)
+        self.assertIsNotNone(self.database[COLLECTION].find_one({'_id': self.reservation._id}))
+        self.assertIsNone(self.database[COLLECTION_TEMP].find_one({'_id': self.reservation._id}))
+        self.assertEqual(1000, self.database[SUMMARY_COLLECTION].find_one({}).get('turns_version'))
+
+    def test_summaries_are_refreshed_after_the_commit(self):
+        self.database[SUMMARY_COLLECTION].delete_many({})
+        sessions = []
+        save = DateSummary.save
+
+        def spied_save(summaries):
+            sessions.append(Database.session())
+            return save(summaries)
+
+        with mock.patch.object(DateSummary, 'save', spied_save):
+            self.pay()
+        self.assertEqual([None], sessions)
+        self.assertEqual(1, self.database[SUMMARY_COLLECTION].count_documents({}))
+
+
+@unittest.skipUnless(os.environ.get('MONGODB_REPLICA_SET_URI'), "MONGODB_REPLICA_SET_URI is not set")
+class ReplicaSetTransactionTest(unittest.TestCase):
+    """
+    Runs against the throwaway database of a real replica set, such as mongodb://127.0.0.1:27017/test?replicaSet=rs0
+    """
+    def setUp(self):
+        patches = mock.patch.multiple(Database, URI=os.environ.get('MONGODB_REPLICA_SET_URI'), CLIENT=None, PID=None,
+                                      DATABASE=None, TRANSACTIONS=None)
+        patches.start()
+        self.addCleanup(patches.stop)
+        Database.initialize()
+        self.addCleanup(lambda: Database.CLIENT.close())
+        self.addCleanup(lambda: Database.remove(COLLECTION_TEMP, {'_id': {'$regex': '^test-'}}))
+
+    def test_failed_transaction_discards_every_write(self):
+        def commit():
+            Database.insert(COLLECTION_TEMP, {'_id': 'test-first'})
+            Database.insert(COLLECTION_TEMP, {'_id': 'test-second'})
+            raise PyMongoError("Escritura fallida a propósito")
+
+        self.assertTrue(Database.supports_transactions())
+        with self.assertRaises(PyMongoError):
+            Database.run_in_transaction(commit)
+        self.assertEqual(0, Database.DATABASE[COLLECTION_TEMP].count_documents({'_id': {'$regex': '^test-'}}))
+
+    def test_check_transactions(self):
+        from manage import app
+        result = app.test_cli_runner().invoke(args=['check-transactions'])
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertIn("Abortar: ok", result.output)
+        self.assertIn("Reintentar: ok", result.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import datetime
+
+from app.models.promos.constants import COLLECTION as PROMOS
+from app.models.reservations.reservation import Reservation
+from tests.mongo import MongoTestCase
+
+
+class InsertPromoTest(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        today = datetime.date.today()
+        self.coupons = [{'_id': f'cupon{i}', 'copies_left': 1, 'date_applied': None, 'status': True}
+                        for i in range(3)]
+        self.database[PROMOS].insert_one({'_id': 'promo', 'existence': 3,
+                                          'start_date': (today - datetime.timedelta(days=1)).strftime("%Y-%m-%d"),
+                                          'end_date': (today + datetime.timedelta(days=1)).strftime("%Y-%m-%d"),
+                                          'required_races': 1, 'at_least': True, 'type': 'Descuento', 'value': 10,
+                                          'authorised': True, 'coupons': self.coupons})
+        location = {'_id': 'pista', 'name': 'Pista', 'type': {'GOKART': [100, 180], 'CADET': [80], 'LICENCIA': 50}}
+        self.database['locations'].insert_one(location)
+        self.reservation = Reservation('Adultos', datetime.datetime(2026, 11, 2), location=location,
+                                       turns=[{'schedule': '12', 'turn_number': 1, 'positions': {}}],
+                                       amount=100, total_pilots=1, total_races=1)
+
+    def test_keeps_every_coupon(self):
+        self.reservation.insert_promo('cupon1')
+        promo = self.database[PROMOS].find_one({'_id': 'promo'})
+        self.assertEqual(promo.get('coupons'), self.coupons)
+        self.assertEqual(self.reservation.coupon_id, 'cupon1')
+        self.assertEqual(self.reservation.discount, 10)
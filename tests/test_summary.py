@@ -0,0 +1,39 @@
+import datetime
+
+from app.models.dates.constants import COLLECTION as DATES, SUMMARY_COLLECTION, MEXICO_TZ
+from app.models.dates.date import Date
+from app.models.dates.summary import DateSummary
+from app.models.reservations.reservation import Reservation
+from tests.mongo import MongoTestCase
+
+
+class PartialSummariesTest(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        for day in range(1, 6):
+            Date.add({'year': 2026, 'month': 11}, day)
+        # The second day is fully booked by Kids, so its status differs from the empty days
+        day = self.database[DATES].find_one({'date': MEXICO_TZ.localize(datetime.datetime(2026, 11, 2))})
+        for schedule in day.get('schedules'):
+            for turn in schedule.get('turns'):
+                turn.update({'type': 'Niños', 'version': 1, 'occupied': 255,
+                             'pilots': [{'_id': f'{turn.get("_id")}{k}', 'position': k, 'allocation_date': None}
+                                        for k in range(1, 9)]})
+        self.database[DATES].replace_one({'_id': day.get('_id')}, day)
+        DateSummary.refresh_dates({'_id': day.get('_id')})
+        self.reservation = Reservation('Adultos', datetime.datetime(2026, 11, 1))
+
+    def test_every_day_is_shown_without_some_summaries(self):
+        complete = Date.get_available_dates_user(self.reservation, '2026-11-01', '2026-11-05')
+        self.database[SUMMARY_COLLECTION].delete_many({'date': {'$gte': MEXICO_TZ.localize(
+            datetime.datetime(2026, 11, 4))}})
+        self.assertFalse(DateSummary.covers('2026-11-01', '2026-11-05',
+                                            DateSummary.get_version('2026-11-01', '2026-11-05')))
+        partial = Date.get_available_dates_user(self.reservation, '2026-11-01', '2026-11-05')
+        self.assertEqual(len(complete), 5)
+        self.assertEqual(sorted(partial, key=lambda date: date.get('fecha')), complete)
+        self.assertEqual([date.get('cupo') for date in complete], [1, 0, 1, 2, 2])
+
+    def test_summaries_stand_for_a_complete_range(self):
+        self.assertTrue(DateSummary.covers('2026-11-01', '2026-11-05',
+                                           DateSummary.get_version('2026-11-01', '2026-11-05')))
@@ -0,0 +1,44 @@
+import datetime
+import types
+from unittest import mock
+
+from app.models.dates import date as date_module
+from app.models.dates.constants import MEXICO_TZ
+from app.models.dates.date import Date
+from app.models.reservations.reservation import Reservation
+from tests.mongo import MongoTestCase
+
+
+class FrozenDatetime(datetime.datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return tz.localize(datetime.datetime(2026, 11, 2, 10))
+
+
+class TurnAvailabilityTest(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        Date.add({'year': 2026, 'month': 11}, 2)
+        # It is 10:00 of the day, so only the schedules from 14 hrs on are shown
+        frozen = mock.patch.object(date_module, 'datetime', types.SimpleNamespace(
+            datetime=FrozenDatetime, timedelta=datetime.timedelta))
+        frozen.start()
+        self.addCleanup(frozen.stop)
+
+    def availability(self, reserved, schedule, turn_number):
+        reservation = Reservation('Adultos', datetime.datetime(2026, 11, 2), pilots=[],
+                                  turns=[{'schedule': reserved[0], 'turn_number': reserved[1], 'positions': []}])
+        schedules = Date.get_available_schedules_user(reservation, '2026-11-02')
+        expected = next(schedule_status for schedule_status in schedules
+                        if schedule_status.get('schedule') == schedule).get('turns')[turn_number - 1].get('status')
+        status = Date.get_turn_availability(reservation, '2026-11-02', schedule, turn_number).get('status')
+        self.assertEqual(expected, status)
+        return status
+
+    def test_neighbours_of_a_reserved_turn_are_blocked(self):
+        self.assertEqual(0, self.availability(('14', '5'), '14', 4))
+        self.assertEqual(0, self.availability(('14', '5'), '15', 1))
+        self.assertEqual(2, self.availability(('14', '5'), '15', 2))
+
+    def test_turns_of_the_schedules_already_gone_block_nothing(self):
+        self.assertEqual(2, self.availability(('13', '5'), '14', 1))